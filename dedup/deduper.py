@@ -1,31 +1,101 @@
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional, Iterable, Iterator
 from collections import defaultdict
-from dedup.hasher import compute_xxhash, compute_md5, compute_sha1
+from functools import partial
+from dedup.hasher import compute_xxhash, compute_md5, compute_sha1, compute_xxhash_head_tail
+from dedup.parallel_processor import ParallelProcessor
+from dedup.workspace import FileRec
 
 class Deduper:
-    def __init__(self, workspace):
+    def __init__(self, workspace, processor: Optional[ParallelProcessor] = None):
         self.workspace = workspace
+        self.processor = processor or ParallelProcessor()
+        self.batch_size = 4096
+        self._pending_writes = defaultdict(list)  # column -> [(value, path)]
 
-    def find_potential_duplicates(self):
-        files = self.workspace.get_files()
-        hash_map = defaultdict(list)
-        for file in files:
-            if not file['xxhash']:
-                file['xxhash'] = compute_xxhash(file['path'])
-                self.workspace.add_file(file['path'], file['size'], file['modified'], file['xxhash'], file['md5'], file['sha1'], file['status'])
-            hash_map[file['xxhash']].append(file)
-        return [group for group in hash_map.values() if len(group) > 1]
-
-    def confirm_duplicates(self, potential_groups: List[List[Dict]]):
-        confirmed = []
+    def _save_hash(self, file: FileRec, column: str):
+        """Queue a single hash column update to be persisted by the next _flush_writes."""
+        self._pending_writes[column].append((getattr(file, column), file.path))
+
+    def _flush_writes(self):
+        """Persist all queued hash updates in a single transaction."""
+        with self.workspace.transaction():
+            for column, rows in self._pending_writes.items():
+                self.workspace.update_hashes(column, rows)
+        self._pending_writes = defaultdict(list)
+
+    def _hash_batch(self, files: List[FileRec]):
+        """Compute missing xxHashes for a batch of files in parallel."""
+        results = self.processor.process_files_parallel(
+            [(f.path, f.size, f.modified) for f in files],
+            partial(compute_xxhash, algo=self.workspace.hash_algo)
+        )
+        save_hash = self._save_hash
+        for file, xxhash in zip(files, results):
+            file.xxhash = xxhash
+            save_hash(file, 'xxhash')
+
+    def find_potential_duplicates(self) -> Iterator[List[FileRec]]:
+        # Hash any candidates that are still missing an xxHash. Files with a
+        # unique size are never read or hashed.
+        needs_hash = []
+        batch_size = self.batch_size
+        for file in self.workspace.iter_files(batch_size, shared_size_only=True, unhashed_only=True):
+            needs_hash.append(file)
+            if len(needs_hash) >= batch_size:
+                self._hash_batch(needs_hash)
+                needs_hash = []
+        if needs_hash:
+            self._hash_batch(needs_hash)
+        self._flush_writes()
+
+        # Grouping itself runs in SQLite, so warm runs never loop over every file in Python.
+        # Groups are produced lazily so confirmation can start on the first one.
+        return self.workspace.iter_duplicate_hash_groups(batch_size)
+
+    def confirm_duplicates(self, potential_groups: Iterable[List[FileRec]], progress_callback: Optional[Callable] = None):
+        candidate_groups = []
         for group in potential_groups:
+            # Files of different sizes can never be identical
+            size_map = defaultdict(list)
+            for file in group:
+                size_map[file.size].append(file)
+
+            for size_group in size_map.values():
+                if len(size_group) < 2:
+                    continue
+
+                # Cheap head+tail digest before committing to a full read
+                digest_map = defaultdict(list)
+                for file in size_group:
+                    if not file.fastdigest:
+                        file.fastdigest = compute_xxhash_head_tail(file.path, file.size)
+                        self._save_hash(file, 'fastdigest')
+                    if file.fastdigest:
+                        digest_map[file.fastdigest].append(file)
+
+                candidate_groups.extend(g for g in digest_map.values() if len(g) > 1)
+
+        # Compute the remaining MD5s across all groups in parallel
+        needed = [file for group in candidate_groups for file in group if not file.md5]
+        if needed:
+            md5_results = self.processor.process_files_parallel(
+                [(f.path, f.size, f.modified) for f in needed],
+                compute_md5,
+                progress_callback
+            )
+            for file, md5 in zip(needed, md5_results):
+                file.md5 = md5
+                if file.md5:
+                    self._save_hash(file, 'md5')
+
+        confirmed = []
+        for group in candidate_groups:
             md5_map = defaultdict(list)
             for file in group:
-                if not file['md5']:
-                    file['md5'] = compute_md5(file['path'])
-                    self.workspace.add_file(file['path'], file['size'], file['modified'], file['xxhash'], file['md5'], file['sha1'], file['status'])
-                md5_map[file['md5']].append(file)
+                if file.md5:
+                    md5_map[file.md5].append(file)
             for md5_group in md5_map.values():
                 if len(md5_group) > 1:
                     confirmed.append(md5_group)
+        self._flush_writes()
         return confirmed
@@ -1,7 +1,8 @@
 import os
+from functools import partial
 from typing import List, Callable, Optional
-from dedup.workspace import Workspace
-from dedup.scanner import scan_directories
+from dedup.workspace import Workspace, FileRec
+from dedup.scanner import scan_directories, scan_directories_parallel
 from dedup.parallel_processor import ParallelProcessor
 from dedup.deduper import Deduper
 from dedup.hasher import compute_xxhash
@@ -10,8 +11,9 @@ class DedupEngine:
     def __init__(self, workspace_path: str):
         self.workspace = Workspace(workspace_path)
         self.processor = ParallelProcessor()
-        self.deduper = Deduper(self.workspace)
+        self.deduper = Deduper(self.workspace, self.processor)
         self.directories = []
+        self.write_batch_size = 1000
         
     def add_directory(self, directory: str):
         """Add a directory to be scanned."""
@@ -34,12 +36,25 @@ class DedupEngine:
         if not self.directories:
             raise ValueError("No directories to scan")
             
-        # Step 1: Scan directories for files
-        files = scan_directories(self.directories)
+        # Step 1: Scan directories for files, one subtree per worker process
+        # unless the processor is limited to a single worker
+        if self.processor.max_workers > 1:
+            files = scan_directories_parallel(self.directories, max_workers=self.processor.max_workers)
+        else:
+            files = scan_directories(self.directories)
         total_files = len(files)
         
+        # Only hash files that are new or whose size/mtime changed since the last scan
+        existing = self.workspace.get_existing_digests([f[0] for f in files])
+        to_hash = []
+        for f in files:
+            known = existing.get(f[0])
+            if known is None or known[2] is None or known[:2] != (f[1], f[2]):
+                to_hash.append(f)
+        
         if progress_callback:
-            progress_callback("Scanning completed. Found {} files. Starting hashing...".format(total_files))
+            progress_callback("Scanning completed. Found {} files ({} unchanged). Starting hashing...".format(
+                total_files, total_files - len(to_hash)))
         
         # Step 2: Compute xxHash in parallel
         def progress_wrapper(processed, total):
@@ -47,22 +62,31 @@ class DedupEngine:
                 progress = int((processed / total) * 100)
                 progress_callback(f"Hashing: {processed}/{total} ({progress}%)")
         
-        hash_results = self.processor.process_files_parallel(
-            files, 
-            compute_xxhash, 
-            progress_wrapper
-        )
-        
-        # Step 3: Store results in workspace
-        file_dict = {f[0]: (f[1], f[2]) for f in files}  # path -> (size, modified)
+        def error_wrapper(filepath, error):
+            if progress_callback:
+                progress_callback(f"Error hashing {filepath}: {error}")
         
-        for filepath, xxhash in hash_results:
-            if filepath in file_dict:
-                size, modified = file_dict[filepath]
-                self.workspace.add_file(filepath, size, modified, xxhash)
+        # Step 3: Store results in batches as they arrive, so DB writes overlap with hashing
+        rows = []
+        stored = 0
+        for index, xxhash in self.processor.iter_files_parallel(
+            to_hash, 
+            partial(compute_xxhash, algo=self.workspace.hash_algo), 
+            progress_wrapper,
+            error_callback=error_wrapper
+        ):
+            if xxhash:
+                filepath, size, modified = to_hash[index]
+                rows.append(FileRec(filepath, size, modified, xxhash).as_row())
+            if len(rows) >= self.write_batch_size:
+                self.workspace.add_files_bulk(rows)
+                stored += len(rows)
+                rows = []
+        self.workspace.add_files_bulk(rows)
+        stored += len(rows)
         
         if progress_callback:
-            progress_callback(f"Hashing completed. Processed {len(hash_results)} files.")
+            progress_callback(f"Hashing completed. Processed {stored} files.")
     
     def find_duplicates(self, progress_callback: Optional[Callable] = None):
         """
@@ -74,9 +98,14 @@ class DedupEngine:
         potential_groups = self.deduper.find_potential_duplicates()
         
         if progress_callback:
-            progress_callback(f"Found {len(potential_groups)} potential duplicate groups. Confirming with MD5...")
+            progress_callback("Confirming potential duplicate groups with MD5...")
+        
+        def progress_wrapper(processed, total):
+            if progress_callback:
+                progress = int((processed / total) * 100)
+                progress_callback(f"Confirming: {processed}/{total} ({progress}%)")
         
-        confirmed_duplicates = self.deduper.confirm_duplicates(potential_groups)
+        confirmed_duplicates = self.deduper.confirm_duplicates(potential_groups, progress_wrapper)
         
         if progress_callback:
             progress_callback(f"Confirmed {len(confirmed_duplicates)} duplicate groups.")
@@ -1,18 +1,46 @@
 from PyQt6.QtWidgets import (QMainWindow, QTabWidget, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QFileDialog, 
                              QListWidget, QProgressBar, QTableWidget, 
-                             QTableWidgetItem, QHeaderView, QMessageBox,
-                             QMenuBar, QMenu, QTextEdit)
+                             QTableWidgetItem, QTableView, QHeaderView, QMessageBox,
+                             QMenuBar, QMenu, QPlainTextEdit)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QAction, QFont
+from PyQt6.QtGui import QAction, QFont, QColor
 from dedup.workspace import Workspace
 from dedup.gui.scan_thread import ScanThread
+from dedup.gui.results_model import ResultsTableModel
 from dedup.recent_workspaces import RecentWorkspaces
 import os
 import tempfile
+import time
+from typing import Optional
+from collections import deque
 from datetime import datetime
 
 class MainWindow(QMainWindow):
+    # Background colors for the core activity status column
+    CORE_STATUS_HASHING_BG = QColor(144, 238, 144)  # Light green
+    CORE_STATUS_BG = {
+        "Idle": QColor(211, 211, 211),       # Light gray
+        "Waiting": QColor(255, 255, 0),      # Yellow
+        "Scanning": QColor(255, 255, 0),     # Yellow
+        "Completed": QColor(173, 216, 230),  # Light blue
+    }
+    RECENT_OPEN_FG = QColor(0, 0, 255)
+    # Color coding for different log event types
+    LOG_COLOR_MAP = {
+        "SYSTEM": "blue",
+        "SCAN": "green",
+        "CORE": "orange",
+        "ERROR": "red",
+        "WORKSPACE": "purple",
+        "PROGRESS": "gray"
+    }
+    LOG_LINE_TEMPLATE = '<span style="color: {color};">[{timestamp}] {event_type}: {message}</span>'
+    HASH_PROGRESS_FORMAT = "Hashing: {hashed:,} / {total:,} ({percentage:.1f}%) - {remaining:,} remaining"
+    HASH_PROGRESS_ETA_FORMAT = HASH_PROGRESS_FORMAT + " - ETA: {eta}"
+    # Minimum seconds between core activity / hash progress redraws (~10 Hz)
+    UI_UPDATE_INTERVAL = 0.1
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("DeDup - Duplicate File Finder")
@@ -24,6 +52,16 @@ class MainWindow(QMainWindow):
         self.scan_thread = None
         self.current_workspace_path = None
         self.recent_workspaces = RecentWorkspaces()
+        # Timestamps of the last throttled progress redraws
+        self._last_core_update = 0.0
+        self._last_hash_update = 0.0
+        self._last_progress = -1
+        self.hash_start_time: Optional[float] = None  # monotonic time of the first hash progress update
+        # Memoized display strings for the core activity and recent workspace tables
+        self._core_basename_cache = {}  # core_id -> (file_path, basename)
+        self._last_core_status = []  # status shown in each core activity row
+        self._last_browse_dir = ""  # parent of the last directory added
+        self._formatted_dates = {}  # ISO timestamp -> display string
         self.init_menu()
         self.init_tabs()
         self.load_last_workspace()  # Try to load last workspace, or create new one
@@ -34,10 +72,44 @@ class MainWindow(QMainWindow):
         self.log_event("SYSTEM", f"Detected {multiprocessing.cpu_count()} CPU cores available")
 
     def init_tabs(self):
-        self.tabs.addTab(self.create_logging_tab(), "Logging")
-        self.tabs.addTab(self.create_recent_workspaces_tab(), "Recent Workspaces")
+        self.logging_tab = self.create_logging_tab()
+        self.tabs.addTab(self.logging_tab, "Logging")
+        # Recent Workspaces and Results are only built when first shown
+        self._recent_tab_built = False
+        self._results_tab_built = False
+        self._tab_builders = {}  # placeholder widget -> builder
+        self.tabs.addTab(self._lazy_tab(self.build_recent_workspaces_tab), "Recent Workspaces")
         self.tabs.addTab(self.create_workspace_tab(), "Workspace")
-        self.tabs.addTab(self.create_results_tab(), "Results")
+        self.tabs.addTab(self._lazy_tab(self.build_results_tab), "Results")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+    def _lazy_tab(self, builder):
+        placeholder = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        placeholder.setLayout(layout)
+        self._tab_builders[placeholder] = builder
+        return placeholder
+
+    def on_tab_changed(self, index):
+        widget = self.tabs.widget(index)
+        builder = self._tab_builders.pop(widget, None)
+        if builder:
+            widget.layout().addWidget(builder())
+        if widget is self.logging_tab:
+            self.flush_pending_log()
+
+    def build_recent_workspaces_tab(self):
+        tab = self.create_recent_workspaces_tab()
+        self._recent_tab_built = True
+        self.refresh_recent_workspaces()
+        return tab
+
+    def build_results_tab(self):
+        tab = self.create_results_tab()
+        self._results_tab_built = True
+        self.update_results_table()
+        return tab
 
     def create_workspace_tab(self):
         tab = QWidget()
@@ -74,7 +146,10 @@ class MainWindow(QMainWindow):
         resume_layout = QHBoxLayout()
         from PyQt6.QtWidgets import QCheckBox
         self.skip_hashed_checkbox = QCheckBox("Don't rescan hashed files (resume from where left off)")
-        self.skip_hashed_checkbox.setToolTip("Skip files that already have hashes in the database")
+        self.skip_hashed_checkbox.setToolTip("Skip files whose size and modification time match an already hashed "
+                                             "entry in the database. Untick to rehash everything.")
+        # Incremental rescans are the common case, so only changed or new files are hashed by default
+        self.skip_hashed_checkbox.setChecked(True)
         resume_layout.addWidget(self.skip_hashed_checkbox)
         layout.addLayout(resume_layout)
         
@@ -165,10 +240,11 @@ class MainWindow(QMainWindow):
         layout.addLayout(header_layout)
         
         # Log display
-        self.log_display = QTextEdit()
+        self.log_display = QPlainTextEdit()
         self.log_display.setReadOnly(True)
         self.log_display.setFont(QFont("Courier", 9))  # Monospace font
-        # Note: setMaximumBlockCount not available in QTextEdit, will manage manually
+        # Plain text layout keeps appends cheap; Qt drops the oldest lines past the limit
+        self.log_display.setMaximumBlockCount(5000)
         layout.addWidget(self.log_display)
         
         # Status
@@ -178,6 +254,12 @@ class MainWindow(QMainWindow):
         
         tab.setLayout(layout)
         self.auto_scroll_enabled = True
+        # Log lines are buffered and appended at most every 50ms (only while visible)
+        self._pending_log_lines = deque(maxlen=5000)  # (datetime, event_type, message)
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setInterval(50)
+        self.log_flush_timer.timeout.connect(self.flush_pending_log)
+        self.log_flush_timer.start()
         return tab
 
     def create_recent_workspaces_tab(self):
@@ -189,7 +271,7 @@ class MainWindow(QMainWindow):
         header_layout.addWidget(QLabel("Recent Workspaces"))
         
         refresh_btn = QPushButton("Refresh")
-        refresh_btn.clicked.connect(self.refresh_recent_workspaces)
+        refresh_btn.clicked.connect(self.reload_recent_workspaces)
         header_layout.addWidget(refresh_btn)
         
         clear_btn = QPushButton("Clear All")
@@ -207,10 +289,11 @@ class MainWindow(QMainWindow):
         self.recent_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
         self.recent_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
         self.recent_table.cellDoubleClicked.connect(self.open_recent_workspace)
+        self.recent_table.cellClicked.connect(self.on_recent_cell_clicked)
         layout.addWidget(self.recent_table)
         
         # Instructions
-        instructions = QLabel("Double-click a workspace to open it, or use the Open button.")
+        instructions = QLabel("Double-click a workspace to open it, or click Open.")
         instructions.setStyleSheet("color: gray; font-style: italic;")
         layout.addWidget(instructions)
         
@@ -222,9 +305,9 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout()
         
         # Results table
-        self.results_table = QTableWidget()
-        self.results_table.setColumnCount(5)
-        self.results_table.setHorizontalHeaderLabels(['File Path', 'Size', 'Modified', 'xxHash', 'Status'])
+        self.results_model = ResultsTableModel(self)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         layout.addWidget(self.results_table)
         
@@ -232,7 +315,10 @@ class MainWindow(QMainWindow):
         return tab
         
     def add_directory(self):
-        directory = QFileDialog.getExistingDirectory(self, "Select Directory")
+        directory = QFileDialog.getExistingDirectory(self, "Select Directory", self._last_browse_dir)
+        if directory:
+            # Start the next browse next to this one, where sibling folders usually are
+            self._last_browse_dir = os.path.dirname(directory)
         if directory and directory not in self.directories:
             self.directories.append(directory)
             self.dir_list.addItem(directory)
@@ -253,21 +339,23 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "No Workspace", "Please create or open a workspace first.")
             return
             
-        # Clear previous results
-        self.workspace.clear_files()
+        skip_hashed = self.skip_hashed_checkbox.isChecked()
+        # A full rescan starts from an empty table. With skip enabled the stored rows are
+        # what unchanged files are matched against, so they are kept; the scan thread
+        # removes rows for files it no longer finds.
+        if not skip_hashed:
+            self.workspace.clear_files()
         
         self.scan_btn.setEnabled(False)
         self.cancel_btn.setEnabled(True)
         self.progress_bar.setValue(0)
+        self._last_progress = 0
         
         # Start scanning in background thread
         workspace_path = self.current_workspace_path if self.current_workspace_path else self.workspace.db_path
-        skip_hashed = self.skip_hashed_checkbox.isChecked()
-        self.scan_thread = ScanThread(self.directories, workspace_path, skip_hashed)
-        
-        # Connect logging callback
-        self.scan_thread.log_callback = self.log_event
+        self.scan_thread = ScanThread(self.directories, workspace_path, skip_hashed, self.workspace.hash_algo)
         
+        self.scan_thread.log_message.connect(self.log_event)
         self.scan_thread.progress_updated.connect(self.update_progress)
         self.scan_thread.folder_changed.connect(self.update_current_folder)
         self.scan_thread.file_counted.connect(self.update_file_count)
@@ -281,8 +369,7 @@ class MainWindow(QMainWindow):
         self.log_event("SYSTEM", f"Starting new scan with workspace: {os.path.basename(workspace_path)}")
         
         # Reset hash progress tracking
-        if hasattr(self, 'hash_start_time'):
-            delattr(self, 'hash_start_time')
+        self.hash_start_time = None
         self.hash_progress_label.setText("")
         
         self.scan_thread.start()
@@ -295,7 +382,11 @@ class MainWindow(QMainWindow):
             
     def update_progress(self, current, total):
         if total > 0:
-            progress = int((current / total) * 100)
+            progress = current * 100 // total
+            # The bar has only 100 states; skip signals that would not move it
+            if progress == self._last_progress:
+                return
+            self._last_progress = progress
             self.progress_bar.setValue(progress)
             
     def update_current_folder(self, folder):
@@ -304,19 +395,24 @@ class MainWindow(QMainWindow):
     def update_file_count(self, count):
         self.file_count_label.setText(f"Files found: {count}")
     
-    def update_hash_progress(self, hashed, total):
+    def update_hash_progress(self, hashed, total, force=False):
         """Update the hashing progress display with time estimation."""
+        # The final update always goes through so the label ends on the real totals
+        now = time.monotonic()
+        if not force and hashed < total and now - self._last_hash_update < self.UI_UPDATE_INTERVAL:
+            return
+        self._last_hash_update = now
+        
         if total > 0:
             percentage = (hashed / total) * 100
             remaining = total - hashed
             
             # Calculate time estimation
-            if not hasattr(self, 'hash_start_time'):
-                import time
-                self.hash_start_time = time.time()
+            if self.hash_start_time is None:
+                self.hash_start_time = now
                 
-            if hashed > 0:
-                elapsed_time = time.time() - self.hash_start_time
+            elapsed_time = now - self.hash_start_time
+            if hashed > 0 and elapsed_time > 0:
                 rate = hashed / elapsed_time  # files per second
                 if rate > 0:
                     eta_seconds = remaining / rate
@@ -327,46 +423,70 @@ class MainWindow(QMainWindow):
                     else:
                         eta_str = f"{eta_seconds/3600:.1f}h"
                     
-                    self.hash_progress_label.setText(
-                        f"Hashing: {hashed:,} / {total:,} ({percentage:.1f}%) - {remaining:,} remaining - ETA: {eta_str}"
-                    )
-                else:
-                    self.hash_progress_label.setText(f"Hashing: {hashed:,} / {total:,} ({percentage:.1f}%) - {remaining:,} remaining")
-            else:
-                self.hash_progress_label.setText(f"Hashing: {hashed:,} / {total:,} ({percentage:.1f}%) - {remaining:,} remaining")
+                    self.hash_progress_label.setText(self.HASH_PROGRESS_ETA_FORMAT.format(
+                        hashed=hashed, total=total, percentage=percentage, remaining=remaining, eta=eta_str))
+                    return
+            self.hash_progress_label.setText(self.HASH_PROGRESS_FORMAT.format(
+                hashed=hashed, total=total, percentage=percentage, remaining=remaining))
         
     def update_status(self, status):
         self.status_label.setText(status)
         
-    def update_core_activity(self, core_data):
+    def update_core_activity(self, core_data, force=False):
         """Update the core activity table with current core status."""
-        self.core_activity_table.setRowCount(len(core_data))
+        # Redraw at most every UI_UPDATE_INTERVAL; reset_scan_ui forces the final, empty update
+        now = time.monotonic()
+        if not force and now - self._last_core_update < self.UI_UPDATE_INTERVAL:
+            return
+        self._last_core_update = now
         
-        for row, (core_id, status, current_file) in enumerate(core_data):
-            self.core_activity_table.setItem(row, 0, QTableWidgetItem(f"Core {core_id}"))
-            self.core_activity_table.setItem(row, 1, QTableWidgetItem(status))
+        table = self.core_activity_table
+        table.setUpdatesEnabled(False)
+        try:
+            # Items are created only for new rows and reused on later updates
+            old_rows = table.rowCount()
+            last_status = self._last_core_status
+            if old_rows != len(core_data):
+                table.setRowCount(len(core_data))
+                for row in range(old_rows, len(core_data)):
+                    for column in range(3):
+                        table.setItem(row, column, QTableWidgetItem())
+                del last_status[len(core_data):]
+                last_status.extend([None] * (len(core_data) - len(last_status)))
             
-            # Show just the filename for current file
-            if current_file:
-                filename = os.path.basename(current_file)
-                self.core_activity_table.setItem(row, 2, QTableWidgetItem(filename))
-            else:
-                self.core_activity_table.setItem(row, 2, QTableWidgetItem(""))
+            for row, (core_id, status, current_file) in enumerate(core_data):
+                table.item(row, 0).setText(f"Core {core_id}")
+                
+                # Status text and color only change when the status does
+                if status != last_status[row]:
+                    last_status[row] = status
+                    self._set_core_status_item(table.item(row, 1), status)
+                
+                # Show just the filename for current file
+                if current_file:
+                    cached = self._core_basename_cache.get(core_id)
+                    if cached is None or cached[0] != current_file:
+                        cached = (current_file, os.path.basename(current_file))
+                        self._core_basename_cache[core_id] = cached
+                    filename = cached[1]
+                else:
+                    filename = ""
+                table.item(row, 2).setText(filename)
+        finally:
+            table.setUpdatesEnabled(True)
+    
+    def _set_core_status_item(self, status_item, status):
+        status_item.setText(status)
         
         # Color coding for status
-        from PyQt6.QtGui import QColor
-        for row in range(len(core_data)):
-            status_item = self.core_activity_table.item(row, 1)
-            if status_item:
-                status = status_item.text()
-                if "Hashing" in status:
-                    status_item.setBackground(QColor(144, 238, 144))  # Light green
-                elif status == "Idle":
-                    status_item.setBackground(QColor(211, 211, 211))  # Light gray
-                elif status == "Waiting" or status == "Scanning":
-                    status_item.setBackground(QColor(255, 255, 0))    # Yellow
-                elif status == "Completed":
-                    status_item.setBackground(QColor(173, 216, 230))  # Light blue
+        if "Hashing" in status:
+            status_item.setBackground(self.CORE_STATUS_HASHING_BG)
+        else:
+            color = self.CORE_STATUS_BG.get(status)
+            if color is not None:
+                status_item.setBackground(color)
+            else:
+                status_item.setData(Qt.ItemDataRole.BackgroundRole, None)
         
     def scan_finished(self, files):
         # Update workspace metadata
@@ -376,7 +496,9 @@ class MainWindow(QMainWindow):
             if self.current_workspace_path:
                 self.workspace.save_directories(self.directories)
         
-        self.update_results_table()
+        # Keeps scroll position; only the visible pages are re-read
+        if self._results_tab_built:
+            self.results_model.refresh()
         
         # Show completion message with stats
         stats = self.workspace.get_workspace_stats() if self.workspace else {}
@@ -391,15 +513,10 @@ class MainWindow(QMainWindow):
         QMessageBox.information(self, "Scan Complete", message)
         
     def update_results_table(self):
-        files = self.workspace.get_files()
-        self.results_table.setRowCount(len(files))
-        
-        for row, file_data in enumerate(files):
-            self.results_table.setItem(row, 0, QTableWidgetItem(file_data['path']))
-            self.results_table.setItem(row, 1, QTableWidgetItem(str(file_data['size'])))
-            self.results_table.setItem(row, 2, QTableWidgetItem(str(file_data['modified'])))
-            self.results_table.setItem(row, 3, QTableWidgetItem(file_data['xxhash'] or ''))
-            self.results_table.setItem(row, 4, QTableWidgetItem(file_data['status']))
+        # The Results tab loads the current workspace itself when first shown
+        if not self._results_tab_built:
+            return
+        self.results_model.set_workspace(self.workspace)
         
     def reset_scan_ui(self):
         self.scan_btn.setEnabled(True)
@@ -414,8 +531,8 @@ class MainWindow(QMainWindow):
                 self.file_count_label.setText("")
                 self.hash_progress_label.setText("")
         
-        # Clear core activity
-        self.core_activity_table.setRowCount(0)
+        # Clear core activity; forced so the throttle cannot drop the end-of-scan state
+        self.update_core_activity([], force=True)
     
     def new_workspace(self):
         """Create a new workspace."""
@@ -430,7 +547,7 @@ class MainWindow(QMainWindow):
         
         self.directories = []
         self.dir_list.clear()
-        self.results_table.setRowCount(0)
+        self.update_results_table()
         self.setWindowTitle("DeDup - Duplicate File Finder - New Workspace")
         self.status_label.setText("New workspace created. Add directories to scan.")
         
@@ -439,7 +556,7 @@ class MainWindow(QMainWindow):
     def open_workspace(self):
         """Open an existing workspace."""
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Open Workspace", "", "DeDup Workspace Files (*.dedupe)"
+            self, "Open Workspace", self._workspace_dialog_dir(), "DeDup Workspace Files (*.dedupe)"
         )
         
         if file_path:
@@ -472,6 +589,14 @@ class MainWindow(QMainWindow):
                 self.log_event("ERROR", f"Failed to open workspace: {str(e)}")
                 QMessageBox.critical(self, "Error", f"Failed to open workspace:\n{str(e)}")
     
+    def _workspace_dialog_dir(self):
+        """Folder of the current workspace, unless it is the temporary one."""
+        if self.current_workspace_path:
+            folder = os.path.dirname(os.path.abspath(self.current_workspace_path))
+            if folder != os.path.abspath(tempfile.gettempdir()):
+                return folder
+        return ""
+    
     def save_workspace(self):
         """Save the current workspace."""
         if not self.current_workspace_path:
@@ -482,7 +607,7 @@ class MainWindow(QMainWindow):
     def save_workspace_as(self):
         """Save the workspace with a new name."""
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "Save Workspace As", "", "DeDup Workspace Files (*.dedupe)"
+            self, "Save Workspace As", self._workspace_dialog_dir(), "DeDup Workspace Files (*.dedupe)"
         )
         
         if file_path:
@@ -496,21 +621,12 @@ class MainWindow(QMainWindow):
             if not self.workspace:
                 self.workspace = Workspace.create_workspace(file_path)
             else:
-                # If we're saving to a new location, create a new workspace
+                # If we're saving to a new location, copy the database there and switch to it
                 if file_path != self.current_workspace_path:
-                    old_files = self.workspace.get_files()
-                    old_directories = self.directories.copy()
+                    new_workspace = self.workspace.copy_to(file_path)
                     self.workspace.close()
-                    
-                    self.workspace = Workspace.create_workspace(file_path)
-                    
-                    # Copy data to new workspace
-                    for file_data in old_files:
-                        self.workspace.add_file(
-                            file_data['path'], file_data['size'], file_data['modified'],
-                            file_data['xxhash'], file_data['md5'], file_data['sha1'], file_data['status']
-                        )
-                    self.directories = old_directories
+                    self.workspace = new_workspace
+                    self.update_results_table()
             
             # Save directories
             self.workspace.save_directories(self.directories)
@@ -557,8 +673,15 @@ class MainWindow(QMainWindow):
         # Fall back to new workspace
         self.new_workspace()
     
+    def reload_recent_workspaces(self):
+        """Re-check which recent workspaces still exist, then redraw the table."""
+        self.recent_workspaces.reload()
+        self.refresh_recent_workspaces()
+    
     def refresh_recent_workspaces(self):
         """Refresh the recent workspaces table."""
+        if not self._recent_tab_built:
+            return
         recent_workspaces = self.recent_workspaces.get_recent_workspaces()
         self.recent_table.setRowCount(len(recent_workspaces))
         
@@ -572,19 +695,28 @@ class MainWindow(QMainWindow):
             # Last opened (formatted)
             last_opened = workspace.get('last_opened', '')
             if last_opened:
-                try:
-                    dt = datetime.fromisoformat(last_opened)
-                    formatted_date = dt.strftime('%Y-%m-%d %H:%M')
-                except:
-                    formatted_date = last_opened
+                formatted_date = self._formatted_dates.get(last_opened)
+                if formatted_date is None:
+                    try:
+                        dt = datetime.fromisoformat(last_opened)
+                        formatted_date = dt.strftime('%Y-%m-%d %H:%M')
+                    except:
+                        formatted_date = last_opened
+                    self._formatted_dates[last_opened] = formatted_date
             else:
                 formatted_date = 'Unknown'
             self.recent_table.setItem(row, 2, QTableWidgetItem(formatted_date))
             
-            # Open button
-            open_btn = QPushButton("Open")
-            open_btn.clicked.connect(lambda checked, path=workspace.get('path'): self.open_workspace_by_path(path))
-            self.recent_table.setCellWidget(row, 3, open_btn)
+            # Open action; clicks are handled by on_recent_cell_clicked
+            open_item = QTableWidgetItem("Open")
+            open_item.setForeground(self.RECENT_OPEN_FG)
+            open_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+            self.recent_table.setItem(row, 3, open_item)
+    
+    def on_recent_cell_clicked(self, row, column):
+        """Open the workspace when its Open cell is clicked."""
+        if column == 3:
+            self.open_recent_workspace(row, column)
     
     def open_recent_workspace(self, row, column):
         """Open workspace when double-clicked."""
@@ -643,35 +775,39 @@ class MainWindow(QMainWindow):
     
     def log_event(self, event_type, message):
         """Add an event to the logging tab with timestamp."""
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]  # Include milliseconds
-        
-        # Color coding for different event types
-        color_map = {
-            "SYSTEM": "blue",
-            "SCAN": "green", 
-            "CORE": "orange",
-            "ERROR": "red",
-            "WORKSPACE": "purple",
-            "PROGRESS": "gray"
-        }
+        # Only the raw event is queued here; formatting happens in flush_pending_log
+        self._pending_log_lines.append((datetime.now(), event_type, message))
+    
+    def flush_pending_log(self):
+        """Append buffered log lines in one go while the Logging tab is visible."""
+        # Skip Qt layout work entirely while nobody can see the log
+        if not self._pending_log_lines or self.tabs.currentWidget() is not self.logging_tab:
+            return
         
-        color = color_map.get(event_type, "black")
-        log_line = f'<span style="color: {color};">[{timestamp}] {event_type}: {message}</span>'
+        color_map = self.LOG_COLOR_MAP
+        template = self.LOG_LINE_TEMPLATE
+        log_lines = []
+        for when, event_type, message in self._pending_log_lines:
+            timestamp = when.strftime("%H:%M:%S.%f")[:-3]  # Include milliseconds
+            color = color_map.get(event_type, "black")
+            log_lines.append(template.format(color=color, timestamp=timestamp, event_type=event_type, message=message))
+        self._pending_log_lines.clear()
         
-        self.log_display.append(log_line)
+        self._append_log_lines(log_lines)
+        self.log_status.setText(f"Last: {event_type} at {timestamp}")
+    
+    def _append_log_lines(self, lines):
+        # One <p> per line keeps each entry a separate block for setMaximumBlockCount
+        self.log_display.appendHtml("".join(f"<p>{line}</p>" for line in lines))
         
         if self.auto_scroll_enabled:
-            cursor = self.log_display.textCursor()
-            cursor.movePosition(cursor.MoveOperation.End)
-            self.log_display.setTextCursor(cursor)
-        
-        # Update status
-        self.log_status.setText(f"Last: {event_type} at {timestamp}")
+            scrollbar = self.log_display.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
     
     def clear_log(self):
         """Clear the log display."""
         self.log_display.clear()
+        self._pending_log_lines.clear()
         self.log_status.setText("Log cleared")
         self.log_event("SYSTEM", "Log cleared by user")
     
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from dedup.workspace import Workspace, DISPLAY_COLUMNS
+
+class ResultsTableModel(QAbstractTableModel):
+    """Table model over workspace files; only pages with visible rows are read from SQLite."""
+    HEADERS = ['File Path', 'Size', 'Modified', 'xxHash', 'Status']
+    PAGE_SIZE = 64
+    MAX_CACHED_PAGES = 64
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.workspace: Optional[Workspace] = None
+        self._row_count = 0
+        self._pages: OrderedDict = OrderedDict()  # page number -> column lists, in LRU order
+
+    def set_workspace(self, workspace: Optional[Workspace]):
+        self.beginResetModel()
+        self.workspace = workspace
+        self._row_count = workspace.count_files() if workspace else 0
+        self._pages.clear()
+        self.endResetModel()
+
+    def refresh(self):
+        """Pick up rows added or changed in the workspace without resetting the view."""
+        new_count = self.workspace.count_files() if self.workspace else 0
+        old_count = self._row_count
+        # Rows vanished; a full reset is simplest then
+        if new_count < old_count:
+            self.set_workspace(self.workspace)
+            return
+
+        self._pages.clear()
+        if old_count:
+            self.dataChanged.emit(self.index(0, 0), self.index(old_count - 1, len(self.HEADERS) - 1))
+        if new_count > old_count:
+            self.beginInsertRows(QModelIndex(), old_count, new_count - 1)
+            self._row_count = new_count
+            self.endInsertRows()
+
+    def _page(self, page_no: int) -> Tuple[list, ...]:
+        page = self._pages.get(page_no)
+        if page is None:
+            page = self.workspace.get_files_columns(DISPLAY_COLUMNS, page_no * self.PAGE_SIZE, self.PAGE_SIZE)
+            self._pages[page_no] = page
+            if len(self._pages) > self.MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_no)
+        return page
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        page_no, offset = divmod(index.row(), self.PAGE_SIZE)
+        values = self._page(page_no)[index.column()]
+        if offset >= len(values):
+            return None
+        value = values[offset]
+        return '' if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
@@ -2,24 +2,28 @@ from PyQt6.QtCore import QThread, pyqtSignal
 import os
 import sqlite3
 import threading
-from dedup.scanner import scan_directories
-from dedup.hasher import compute_xxhash
+import time
+import itertools
+import traceback
+from array import array
+from collections import Counter, deque
+from functools import partial
+from dedup.hasher import compute_xxhash, DEFAULT_XXHASH_ALGO
+from dedup.workspace import FILE_COLUMNS, upsert_files_sql
 
-def hash_single_file(file_info):
-    """
-    Standalone function for ProcessPoolExecutor to hash a single file.
-    Returns (filepath, xxhash_result, process_id) or (filepath, None, process_id) on error.
-    """
-    filepath, size, modified = file_info
-    try:
-        import os
-        process_id = os.getpid()  # Get actual process ID
-        xxhash = compute_xxhash(filepath)
-        return filepath, xxhash, process_id
-    except Exception as e:
-        return filepath, None, os.getpid()
+# os.cpu_count() reads /proc on every call, so look it up once
+_CPU_COUNT = os.cpu_count() or 1
+
+# Scan rows carry no fastdigest, so an unchanged file keeps its stored one
+_UPSERT_SCAN_ROWS_SQL = upsert_files_sql(FILE_COLUMNS[:7])
+
+def _new_file_columns():
+    """Empty (paths, sizes, mtimes) columns; sizes and mtimes are packed int64 arrays."""
+    return [], array('q'), array('q')
 
 class ScanThread(QThread):
+    UI_UPDATE_INTERVAL = 0.05  # Seconds between progress signals (~20 Hz)
+    
     # Signals for updating UI
     progress_updated = pyqtSignal(int, int)  # current, total
     folder_changed = pyqtSignal(str)  # current folder
@@ -28,94 +32,141 @@ class ScanThread(QThread):
     core_activity_updated = pyqtSignal(list)  # list of (core_id, status, current_file)
     hash_progress_updated = pyqtSignal(int, int)  # hashed, total
     scan_completed = pyqtSignal(list)  # list of files with hashes
+    log_message = pyqtSignal(str, str)  # event_type, message
     
-    def __init__(self, directories, workspace_path, skip_hashed=False):
+    def __init__(self, directories, workspace_path, skip_hashed=False, hash_algo=DEFAULT_XXHASH_ALGO):
         super().__init__()
         self.directories = directories
         self.workspace_path = workspace_path
         self.skip_hashed = skip_hashed
+        self.hash_algo = hash_algo
         self.cancelled = False
+        self._failed = False  # Set when the scan stops on an error rather than a user cancel
+        self._unreadable_folders = []  # Folders discovery could not list; their rows are kept
         self.thread_conn = None
-        self.core_status = {}  # Track core activity
-        self.global_file_count = 0  # Thread-safe global counter
-        self.count_lock = threading.Lock()  # Lock for thread safety
-        self.log_callback = None  # Will be set by MainWindow
+        self.core_status = []  # (status, folder) per scan worker; each worker writes only its own slot
+        self.db_batch_size = 1000  # Rows per INSERT transaction
+        self.max_pending_hashes = 256  # Hash tasks in flight before discovery waits on hashing
+        self.hash_task_files = 64  # Files per hash task at most...
+        self.hash_task_bytes = 4 * 1024 * 1024  # ...or until their sizes add up to this
     
     def log_event(self, event_type, message):
-        """Log event if callback is available."""
-        if self.log_callback:
-            self.log_callback(event_type, message)
-    
-    def _update_core_display(self):
-        """Update the core activity display based on current core status."""
-        if hasattr(self, 'core_status'):
-            core_data = []
-            for core_id in sorted(self.core_status.keys()):
-                status, current_item = self.core_status[core_id]
-                core_data.append((core_id, status, current_item))
-            self.core_activity_updated.emit(core_data)
+        """Send a log event to the GUI thread, which formats and displays it."""
+        self.log_message.emit(event_type, message)
     
-    def _filter_unhashed_files(self, all_files):
-        """Filter out files that already have hashes in the database."""
+    def _filter_unhashed_files(self, files):
+        """Return the row indices of (paths, sizes, mtimes) files that still need hashing."""
+        paths, sizes, mtimes = files
         if not self.thread_conn:
-            return all_files
+            return range(len(paths))
         
-        files_to_hash = []
+        # Look paths up in chunks with IN (...) rather than one SELECT per file;
+        # 500 stays well under SQLite's bound-parameter limit
+        known = {}
         cursor = self.thread_conn.cursor()
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT path, size, modified FROM files
+                WHERE path IN ({placeholders}) AND xxhash IS NOT NULL
+            ''', chunk)
+            for path, size, modified in cursor.fetchall():
+                known[path] = (size, modified)
         
-        for filepath, size, modified in all_files:
-            # Check if file already has a hash and hasn't been modified
-            cursor.execute('''
-                SELECT xxhash, modified FROM files 
-                WHERE path = ? AND size = ? AND xxhash IS NOT NULL
-            ''', (filepath, size))
-            
-            result = cursor.fetchone()
-            if result is None:
-                # File not in database or no hash - needs hashing
-                files_to_hash.append((filepath, size, modified))
-            else:
-                existing_xxhash, existing_modified = result
-                if existing_modified != modified:
-                    # File has been modified since last scan - needs rehashing
-                    files_to_hash.append((filepath, size, modified))
-                # else: file already hashed and unchanged - skip it
+        # Files not in the database, without a hash, or changed since the last scan need hashing
+        return [i for i, path in enumerate(paths) if known.get(path) != (sizes[i], mtimes[i])]
         
-        return files_to_hash
+    def _remove_unseen_files(self, paths):
+        """
+        Delete rows for files this scan did not find, i.e. files removed from disk since
+        the last scan. Only rows under a scanned directory are considered, and rows under
+        a folder that could not be listed are kept: an unmounted drive or a permission
+        error must not wipe the hashes stored for it. Returns the count.
+        """
+        if not self.thread_conn:
+            return 0
+        roots = tuple(os.path.join(directory, '') for directory in self.directories)
+        unreadable = tuple(os.path.join(folder, '') for folder in self._unreadable_folders)
+        if unreadable:
+            self.log_event("SCAN", f"Skip mode: Keeping stored files under {len(unreadable)} "
+                                   f"folders that could not be read")
+        seen = set(paths)
+        cursor = self.thread_conn.cursor()
+        cursor.execute('SELECT path FROM files')
+        gone = [(path,) for (path,) in cursor.fetchall()
+                if path not in seen and path.startswith(roots)
+                and not (unreadable and path.startswith(unreadable))]
+        if gone:
+            self.log_event("SCAN", f"Skip mode: Removing {len(gone)} files no longer found in the scanned directories")
+            with self.thread_conn:
+                self.thread_conn.executemany('DELETE FROM files WHERE path = ?', gone)
+        return len(gone)
+        
+    def _iter_folder_files(self, directory):
+        """
+        Yield (folder, file entries) for directory and every folder below it that
+        directly contains files, reading each folder only once. The DirEntry objects
+        are handed on, so scan workers stat them without listing the folder again.
+        As in dedup.scanner, symlinks are neither followed nor reported, so both scan
+        paths return the same files for a tree. Folders that cannot be listed, including
+        a missing directory, are recorded in _unreadable_folders.
+        """
+        pending = [directory]
+        while pending and not self._stopping():
+            folder = pending.pop()
+            files = []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file(follow_symlinks=False):
+                                files.append(entry)
+                            elif entry.is_dir(follow_symlinks=False):
+                                pending.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                self._unreadable_folders.append(folder)
+                continue
+            if files:
+                yield folder, files
         
     def cancel(self):
         self.cancelled = True
-        
-    def update_global_file_count(self, increment):
-        """Thread-safe method to update global file count."""
-        with self.count_lock:
-            self.global_file_count += increment
-            self.file_counted.emit(self.global_file_count)
+    
+    def _stopping(self):
+        """True once the scan was cancelled or has failed, so every worker winds down."""
+        return self.cancelled or self._failed
         
     def run(self):
         try:
             # Create a new SQLite connection for this thread
             self.thread_conn = sqlite3.connect(self.workspace_path)
+            self.thread_conn.execute('PRAGMA journal_mode=WAL')
+            self.thread_conn.execute('PRAGMA synchronous=NORMAL')
+            self.thread_conn.execute('PRAGMA temp_store=MEMORY')
+            self.thread_conn.execute('PRAGMA mmap_size=268435456')
+            self.thread_conn.execute('PRAGMA cache_size=-65536')
+            # Checkpoint far less often during the scan's bulk writes; the WAL is
+            # checkpointed and truncated once when the scan ends. 10000 pages (~40 MB)
+            # rather than 0 on purpose: with auto-checkpoints off, a scan of millions
+            # of files would grow the WAL without bound until that final checkpoint.
+            self.thread_conn.execute('PRAGMA wal_autocheckpoint=10000')
             
             self.status_updated.emit("Starting scan...")
             self.log_event("SCAN", f"Starting scan of {len(self.directories)} directories")
             if self.skip_hashed:
                 self.log_event("SCAN", "Skip hashed files option enabled - will resume from previous scan")
             
-            # Phase 1: File discovery with real-time UI updates
-            from concurrent.futures import ThreadPoolExecutor, as_completed
-            import multiprocessing
-            import time
-            
-            all_files = []
-            file_count = 0
+            # File discovery and hashing with real-time UI updates
+            from concurrent.futures import ThreadPoolExecutor
             
-            # Reset global counter
-            with self.count_lock:
-                self.global_file_count = 0
+            # Files are kept as columns (paths, sizes, mtimes) rather than a list of tuples
+            all_paths, all_sizes, all_mtimes = _new_file_columns()
             
             # Reserve cores for UI responsiveness
-            available_cores = multiprocessing.cpu_count()
+            available_cores = _CPU_COUNT
             reserved_for_ui = 1  # Keep one core free for UI responsiveness
             # Use ALL available cores for folder-level work-stealing from the shared pool
             max_scan_cores = available_cores - reserved_for_ui
@@ -124,214 +175,101 @@ class ScanThread(QThread):
             self.log_event("CORE", f"System has {available_cores} cores, reserving {reserved_for_ui} for UI")
             self.log_event("CORE", f"Allocated {max_scan_cores} cores for directory scanning")
             
-            def scan_single_directory_with_updates(directory):
-                """Scan a single directory with periodic updates."""
-                directory_files = []
-                last_update = time.time()
-                local_count = 0
-                last_count_update = 0
-                
-                try:
-                    for root, dirs, filenames in os.walk(directory):
-                        if self.cancelled:
-                            return directory_files
-                        
-                        # Update UI periodically during scanning
-                        current_time = time.time()
-                        if current_time - last_update > 0.5:  # Update every 500ms
-                            self.folder_changed.emit(f"Scanning: {root}")
-                            self.status_updated.emit(f"Found {local_count} files in {os.path.basename(directory)}...")
-                            last_update = current_time
-                            
-                        for filename in filenames:
-                            if self.cancelled:
-                                return directory_files
-                                
-                            path = os.path.join(root, filename)
-                            try:
-                                stat = os.stat(path)
-                                directory_files.append((path, stat.st_size, int(stat.st_mtime)))
-                                local_count += 1
-                                
-                                # Update global file count every 50 files for responsiveness
-                                if local_count - last_count_update >= 50:
-                                    increment = local_count - last_count_update
-                                    self.update_global_file_count(increment)
-                                    last_count_update = local_count
-                                    
-                            except Exception:
-                                continue
-                                
-                except Exception as e:
-                    self.status_updated.emit(f"Error in {directory}: {str(e)}")
-                
-                # Update with any remaining count
-                if local_count > last_count_update:
-                    increment = local_count - last_count_update
-                    self.update_global_file_count(increment)
-                
-                return directory_files
-            
-            # NEW APPROACH: Folder-level work-stealing parallelism
-            self.log_event("SCAN", f"Using folder-level work-stealing with {max_scan_cores} cores")
-            
-            # Phase 1A: Discover all folders from all directories
-            self.status_updated.emit("Discovering all folders...")
-            all_folders = []
-            
-            for directory in self.directories:
-                if self.cancelled:
-                    break
+            # Hashing runs on threads: xxhash and file reads release the GIL,
+            # so threads hash in parallel without pickling paths to worker processes
+            available_cores_for_hash = available_cores - 1  # Reserve 1 for UI
+            max_hash_cores = max(1, available_cores_for_hash)  # Use ALL available cores (at least one)
+            # Two threads per core keep the disk busy while other threads hash
+            max_hash_threads = max_hash_cores * 2
+            
+            self.log_event("CORE", f"Reserved 1 core for UI, using {max_hash_cores} of {available_cores} cores for hashing")
+            
+            # Discovery, scanning and hashing run as one streaming pipeline: files start
+            # hashing as soon as their folder has been scanned
+            self.log_event("SCAN", f"Using folder-level work-stealing with {max_scan_cores} cores "
+                                   f"and {max_hash_threads} hash threads")
+            self.status_updated.emit("Discovering folders...")
+            from queue import Queue, Empty, Full
+            
+            # Both queues are bounded so discovery cannot run arbitrarily far ahead of hashing
+            folder_queue = Queue(maxsize=1024)  # (folder, file entries); one None per scan worker at the end
+            files_queue = Queue(maxsize=1024)  # (paths, sizes, mtimes) per folder; None when a worker is done
+            
+            def discover_folders():
+                """Producer: queue every folder that directly contains files."""
+                folder_count = 0
                 try:
-                    for root, dirs, files in os.walk(directory):
-                        if self.cancelled:
+                    for directory in self.directories:
+                        if self._stopping():
                             break
-                        if files:  # Only add folders that contain files
-                            all_folders.append(root)
-                except Exception as e:
-                    self.status_updated.emit(f"Error discovering folders in {directory}: {str(e)}")
-                    continue
-            
-            if not all_folders:
-                self.status_updated.emit("No folders with files found")
-                return
-            
-            folder_count = len(all_folders)
-            self.log_event("SCAN", f"Discovered {folder_count} folders across all directories")
-            self.status_updated.emit(f"Found {folder_count} folders. Starting parallel scan...")
-            
-            # Phase 1B: Parallel folder scanning with work-stealing
-            self.log_event("CORE", f"Creating shared work queue with {folder_count} folders for {max_scan_cores} cores")
-            self.log_event("CORE", f"Folder-level parallelism: {folder_count} folders will be distributed across {max_scan_cores} cores dynamically")
-            from queue import Queue
-            import threading
-            
-            folder_queue = Queue()
-            for folder in all_folders:
-                folder_queue.put(folder)
-            
-            results_lock = threading.Lock()
-            core_status_lock = threading.Lock()
+                        try:
+                            for item in self._iter_folder_files(directory):
+                                folder_queue.put(item)
+                                folder_count += 1
+                        except Exception as e:
+                            # Partly walked, so skip mode must not treat its missing files as removed
+                            self._unreadable_folders.append(directory)
+                            self.status_updated.emit(f"Error discovering folders in {directory}: {str(e)}")
+                finally:
+                    for _ in range(max_scan_cores):
+                        folder_queue.put(None)
+                self.log_event("SCAN", f"Discovered {folder_count} folders across all directories")
+            
+            def put_file_batch(item):
+                """Queue item for the consumer, giving up once the scan is cancelled."""
+                while True:
+                    try:
+                        files_queue.put(item, timeout=self.UI_UPDATE_INTERVAL)
+                        return
+                    except Full:
+                        if self._stopping():
+                            return
             
             def scan_folder_worker(core_id):
-                """Worker function that processes folders from shared queue."""
-                worker_files = []
+                """Worker function that scans folders from the shared queue and passes their files on."""
                 folders_processed_by_core = 0
                 
                 self.log_event("CORE", f"Scan worker {core_id} started")
                 
-                while not self.cancelled:
-                    try:
-                        folder = folder_queue.get_nowait()
-                    except:
-                        # No more work in queue
-                        with core_status_lock:
-                            self.core_status[core_id] = ("Complete", None)
-                            self._update_core_display()
-                        self.log_event("CORE", f"Scan worker {core_id} finished - processed {folders_processed_by_core} folders")
-                        break
-                    
-                    try:
-                        # Update core status
-                        with core_status_lock:
-                            self.core_status[core_id] = ("Scanning", folder)
-                            self._update_core_display()
-                        
-                        # Log significant folder pickups (avoid too much noise)
-                        if folder_queue.qsize() % 10 == 0:  # Log every 10th folder pickup
-                            self.log_event("CORE", f"Core {core_id} processing folder, {folder_queue.qsize()} remaining in queue")
-                        
-                        # Scan this folder
-                        folder_files = []
-                        try:
-                            for filename in os.listdir(folder):
-                                if self.cancelled:
-                                    break
-                                    
-                                filepath = os.path.join(folder, filename)
-                                if os.path.isfile(filepath):
-                                    try:
-                                        stat = os.stat(filepath)
-                                        folder_files.append((filepath, stat.st_size, int(stat.st_mtime)))
-                                    except Exception:
-                                        continue
-                        except Exception:
+                try:
+                    while True:
+                        item = folder_queue.get()
+                        if item is None:
+                            break
+                        # Keep draining after a cancel so discovery never blocks on a full queue
+                        if self._stopping():
                             continue
                         
-                        # Add to results thread-safely
-                        with results_lock:
-                            worker_files.extend(folder_files)
-                            folders_processed_by_core += 1
-                            # Update global count periodically
-                            if len(folder_files) > 0:
-                                self.update_global_file_count(len(folder_files))
+                        folder, entries = item
+                        # Single writer per slot, read by the UI tick: no lock needed
+                        self.core_status[core_id] = ("Scanning", folder)
+                        
+                        # Stat the entries discovery already listed
+                        folder_paths, folder_sizes, folder_mtimes = _new_file_columns()
+                        for entry in entries:
+                            if self._stopping():
+                                break
+                            
+                            # Discovery only hands on regular files, so every entry gets stat'ed
+                            try:
+                                stat = entry.stat(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            folder_paths.append(entry.path)
+                            folder_sizes.append(stat.st_size)
+                            folder_mtimes.append(int(stat.st_mtime))
                         
-                    finally:
-                        folder_queue.task_done()
+                        if folder_paths:
+                            put_file_batch((folder_paths, folder_sizes, folder_mtimes))
+                        folders_processed_by_core += 1
+                finally:
+                    self.core_status[core_id] = ("Complete", None)
+                    put_file_batch(None)
                 
-                return worker_files
+                self.log_event("CORE", f"Scan worker {core_id} finished - processed {folders_processed_by_core} folders")
             
             # Initialize core status tracking
-            self.core_status = {}
-            for i in range(max_scan_cores):
-                self.core_status[i] = ("Ready", None)
-            self._update_core_display()
-            
-            try:
-                with ThreadPoolExecutor(max_workers=max_scan_cores) as executor:
-                    # Submit all workers
-                    futures = []
-                    for core_id in range(max_scan_cores):
-                        future = executor.submit(scan_folder_worker, core_id)
-                        futures.append(future)
-                    
-                    # Collect results
-                    for future in as_completed(futures, timeout=300):
-                        if self.cancelled:
-                            break
-                        try:
-                            worker_files = future.result(timeout=60)
-                            all_files.extend(worker_files)
-                            file_count += len(worker_files)
-                        except Exception as e:
-                            self.log_event("ERROR", f"Worker thread error: {str(e)}")
-                    
-                    # Wait for all folders to be processed
-                    folder_queue.join()
-                    
-            except Exception as e:
-                self.log_event("ERROR", f"Parallel scanning failed: {str(e)}")
-                self.status_updated.emit(f"Error in parallel scanning: {str(e)}")
-                # Fall back to sequential scanning
-                all_files = []
-                for directory in self.directories:
-                    if self.cancelled:
-                        break
-                    directory_files = scan_single_directory_with_updates(directory)
-                    all_files.extend(directory_files)
-                    file_count = len(all_files)
-                    self.file_counted.emit(file_count)
-            
-            if self.cancelled:
-                return
-            
-            # Filter out already hashed files if skip option is enabled
-            if self.skip_hashed:
-                original_count = len(all_files)
-                files_to_hash = self._filter_unhashed_files(all_files)
-                skipped_count = original_count - len(files_to_hash)
-                
-                self.log_event("SCAN", f"Skip mode: Found {skipped_count} already hashed files, {len(files_to_hash)} files need hashing")
-                self.status_updated.emit(f"Found {original_count} files, {len(files_to_hash)} need hashing (skipped {skipped_count})")
-                all_files = files_to_hash
-            else:
-                self.status_updated.emit(f"Found {len(all_files)} files. Starting parallel hash computation...")
-                self.log_event("SCAN", f"Completed file discovery: {len(all_files)} files found")
-            
-            # Phase 2: Compute hashes using parallel processing with core tracking
-            from dedup.parallel_processor import ParallelProcessor
-            
-            processor = ParallelProcessor(max_workers=8)  # As per design document
+            self.core_status = [("Ready", None)] * max_scan_cores
             
             def core_update_callback(core_data):
                 """Callback to update UI with core activity."""
@@ -343,192 +281,233 @@ class ScanThread(QThread):
                 if not self.cancelled:
                     self.progress_updated.emit(processed, total)
             
-            # Phase 2: Parallel hashing with real core activity display
-            self.status_updated.emit(f"Starting parallel hashing of {len(all_files)} files...")
-            
-            hash_results = []
-            
-            # NEW APPROACH: Shared file pool with ProcessPoolExecutor for true multi-core
-            available_cores_for_hash = multiprocessing.cpu_count() - 1  # Reserve 1 for UI
-            max_hash_cores = available_cores_for_hash  # Use ALL available cores
-            
-            self.status_updated.emit(f"Using {max_hash_cores} cores for hashing")
-            self.log_event("CORE", f"Reserved 1 core for UI, using {max_hash_cores} of {multiprocessing.cpu_count()} cores for hashing")
-            self.log_event("CORE", f"Switching to ProcessPoolExecutor for true multi-core processing (avoiding GIL)")
-            
-            # ALL files go into shared pool - no separation by size initially
-            self.log_event("CORE", f"Creating shared file pool with {len(all_files)} files for {max_hash_cores} cores")
-            
-            # Split files by size for logging only
-            large_files = [(f, s, m) for f, s, m in all_files if s >= 50 * 1024 * 1024]  # >50MB
-            small_files = [(f, s, m) for f, s, m in all_files if s < 50 * 1024 * 1024]
-            
-            self.status_updated.emit(f"Found {len(large_files)} large files and {len(small_files)} small files")
-            self.log_event("CORE", f"File distribution: {len(large_files)} large files (>50MB), {len(small_files)} small files")
-            self.log_event("CORE", f"All files will be processed from shared pool by {max_hash_cores} processes")
-            
-            # Track which files are being processed by which cores
-            active_cores = {}
-            core_lock = threading.Lock()
-            
-            # Track unique cores that have been used
-            cores_ever_used = set()
-            cores_lock = threading.Lock()
-            
-            def hash_file_with_core_tracking(file_info_and_core):
-                """Hash a single file and track which core is doing it."""
-                (filepath, size, modified), assigned_core_id = file_info_and_core
-                
-                # Use thread ID as actual core identifier
-                import threading
-                actual_thread_id = threading.get_ident() % max_hash_cores
-                
-                # Track which cores are actually being used
-                with cores_lock:
-                    if actual_thread_id not in cores_ever_used:
-                        cores_ever_used.add(actual_thread_id)
-                        self.log_event("CORE", f"Core {actual_thread_id} started working (Total active cores: {len(cores_ever_used)})")
-                
-                with core_lock:
-                    active_cores[actual_thread_id] = {
-                        'status': f"Hashing ({size//1024//1024}MB)" if size > 1024*1024 else "Hashing (Small)",
-                        'file': os.path.basename(filepath)
-                    }
-                    
-                    # Build complete core display
-                    core_data = []
-                    for i in range(max_hash_cores):
-                        if i in active_cores:
-                            core_data.append((i, active_cores[i]['status'], active_cores[i]['file']))
-                        else:
-                            core_data.append((i, "Idle", None))
-                    core_update_callback(core_data)
-                
+            # Per-worker activity: slot i holds (status, file) for hash thread i. Each thread
+            # only writes its own slot, so no lock is needed; the UI tick reads a snapshot.
+            worker_activity = [("Idle", None)] * max_hash_threads
+            worker_slot = threading.local()
+            next_slot = itertools.count()
+            hash_func = partial(compute_xxhash, algo=self.hash_algo)
+            
+            def hash_with_activity(filepaths):
+                """Hash a batch of files in one task, so small files do not each pay for a future."""
+                slot = getattr(worker_slot, 'index', None)
+                if slot is None:
+                    slot = worker_slot.index = next(next_slot)
+                results = []
                 try:
-                    xxhash = compute_xxhash(filepath)
-                    
-                    # Remove from active cores when done
-                    with core_lock:
-                        if actual_thread_id in active_cores:
-                            del active_cores[actual_thread_id]
-                        
-                        # Update display to show completion
-                        core_data = []
-                        for i in range(max_hash_cores):
-                            if i in active_cores:
-                                core_data.append((i, active_cores[i]['status'], active_cores[i]['file']))
-                            else:
-                                core_data.append((i, "Idle", None))
-                        core_update_callback(core_data)
+                    for filepath in filepaths:
+                        worker_activity[slot] = ("Hashing", filepath)
+                        results.append(hash_func(filepath))
+                finally:
+                    # A thread waiting for its next task should not keep showing its last file
+                    worker_activity[slot] = ("Idle", None)
+                return results
+            
+            # Only files sharing their size with another file can be duplicates. The first
+            # file of each size is held back until a second one shows up; files still held
+            # back once discovery ends have a unique size and are stored without a hash.
+            size_counts = Counter()
+            first_of_size = {}  # size -> row index of the held-back file
+            needs_hash = bytearray()  # per row: 0 when skip mode found a current hash
+            skipped_count = 0
+            large_count = 0  # files of 50MB and up, for the distribution log line
+            
+            pending = deque()  # (row indices, future) in submission order
+            hash_task = []  # row indices for the next task
+            hash_task_bytes = 0
+            submitted = 0
+            completed = 0
+            discovering = True
+            last_ui_update = 0.0
+            last_file_count = -1
+            hashed_files = []
+            pending_rows = []
+            
+            def store_hash(index, xxhash):
+                nonlocal pending_rows
+                path, size, modified = all_paths[index], all_sizes[index], all_mtimes[index]
+                hashed_files.append((path, size, modified, xxhash))
+                pending_rows.append((path, size, modified, xxhash, None, None, "present"))
+                # Commit in batches rather than once per file
+                if len(pending_rows) >= self.db_batch_size:
+                    self._add_files_to_db(pending_rows)
+                    pending_rows = []
+            
+            def collect_results(max_pending):
+                """Store finished hashes in order, waiting while more than max_pending are in flight."""
+                nonlocal completed
+                while pending and not self._stopping() and (len(pending) > max_pending or pending[0][1].done()):
+                    indices, future = pending.popleft()
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        self.log_event("ERROR", f"Error processing files: {str(e)}")
+                        results = [None] * len(indices)
+                    for index, xxhash in zip(indices, results):
+                        if xxhash:
+                            store_hash(index, xxhash)
                     
-                    return filepath, xxhash, actual_thread_id
-                except Exception as e:
-                    # Remove from active cores on error
-                    with core_lock:
-                        if actual_thread_id in active_cores:
-                            del active_cores[actual_thread_id]
-                    return filepath, None, actual_thread_id
-            
-            # Process ALL files using ProcessPoolExecutor for true multi-core
-            self.status_updated.emit(f"Starting parallel hashing with {max_hash_cores} worker processes...")
-            self.log_event("CORE", f"Creating ProcessPoolExecutor with {max_hash_cores} workers")
+                    # Log progress periodically
+                    previous = completed
+                    completed += len(indices)
+                    if completed // 1000 != previous // 1000:
+                        self.log_event("CORE", f"Progress: {completed}/{submitted} files")
+            
+            def flush_hash_task():
+                """Submit the files gathered so far as one hash task."""
+                nonlocal hash_task, hash_task_bytes
+                if not hash_task:
+                    return
+                paths = [all_paths[i] for i in hash_task]
+                pending.append((hash_task, hash_executor.submit(hash_with_activity, paths)))
+                hash_task = []
+                hash_task_bytes = 0
+                collect_results(self.max_pending_hashes)
+            
+            def submit_hash(index):
+                nonlocal submitted, hash_task_bytes
+                if not needs_hash[index]:
+                    return
+                hash_task.append(index)
+                hash_task_bytes += all_sizes[index]
+                submitted += 1
+                if len(hash_task) >= self.hash_task_files or hash_task_bytes >= self.hash_task_bytes:
+                    flush_hash_task()
+            
+            def add_batch(paths, sizes, mtimes):
+                """Take in one scanned folder and queue whichever of its files need hashing."""
+                nonlocal skipped_count, large_count
+                start = len(all_paths)
+                all_paths.extend(paths)
+                all_sizes.extend(sizes)
+                all_mtimes.extend(mtimes)
+                if self.skip_hashed:
+                    flags = bytearray(len(paths))
+                    for i in self._filter_unhashed_files((paths, sizes, mtimes)):
+                        flags[i] = 1
+                    skipped_count += len(paths) - sum(flags)
+                else:
+                    flags = bytearray(b'\x01') * len(paths)
+                needs_hash.extend(flags)
+                
+                for index in range(start, len(all_paths)):
+                    size = all_sizes[index]
+                    if size >= 50 * 1024 * 1024:
+                        large_count += 1
+                    count = size_counts[size] + 1
+                    size_counts[size] = count
+                    if count == 1:
+                        first_of_size[size] = index
+                        continue
+                    if count == 2:
+                        submit_hash(first_of_size[size])
+                    submit_hash(index)
+            
+            def publish_progress(force=False):
+                """Emit progress and core activity at most every UI_UPDATE_INTERVAL."""
+                nonlocal last_ui_update, last_file_count
+                now = time.monotonic()
+                if not force and now - last_ui_update < self.UI_UPDATE_INTERVAL:
+                    return
+                last_ui_update = now
+                # Discovery progress is published here rather than by each scan worker
+                if len(all_paths) != last_file_count:
+                    last_file_count = len(all_paths)
+                    self.file_counted.emit(last_file_count)
+                if discovering:
+                    scanning = next((folder for status, folder in self.core_status if folder), None)
+                    if scanning:
+                        self.folder_changed.emit(f"Scanning: {scanning}")
+                progress_update_callback(completed, submitted)
+                self.hash_progress_updated.emit(completed, submitted)
+                if discovering:
+                    self.status_updated.emit(f"Hashing progress: {completed:,}/{submitted:,} files (still discovering)")
+                elif submitted:
+                    percentage = (completed / submitted) * 100
+                    self.status_updated.emit(f"Hashing progress: {completed:,}/{submitted:,} files ({percentage:.1f}%)")
+                # Scan workers first, then hash threads numbered after them
+                core_data = [(core_id, status, current_file)
+                             for core_id, (status, current_file) in enumerate(self.core_status)]
+                core_data.extend((max_scan_cores + i, status, current_file)
+                                 for i, (status, current_file) in enumerate(worker_activity))
+                core_update_callback(core_data)
+            
+            unique_size_rows = []
             
             # Initialize hash progress display
-            self.hash_progress_updated.emit(0, len(file_list))
-            
-            # Create simple file list for processing (no pre-assignment to cores)
-            file_list = [(f, s, m) for f, s, m in all_files]
-            self.log_event("CORE", f"Prepared {len(file_list)} files for shared pool processing")
-            
-            from concurrent.futures import ProcessPoolExecutor
-            
-            # Track process IDs to monitor core utilization
-            processes_used = set()
-            completed = 0
+            self.hash_progress_updated.emit(0, 0)
             
             try:
-                with ProcessPoolExecutor(max_workers=max_hash_cores) as executor:
-                    self.log_event("CORE", f"ProcessPoolExecutor created successfully with max_workers={max_hash_cores}")
-                    
-                    # Submit ALL files to the shared process pool
-                    self.status_updated.emit(f"Submitting {len(file_list)} files to {max_hash_cores} processes...")
-                    self.log_event("CORE", f"Starting to submit {len(file_list)} files to ProcessPoolExecutor")
-                    
-                    # Submit all files at once for better distribution
-                    future_to_file = {}
-                    for file_info in file_list:
-                        if self.cancelled:
-                            break
-                        future = executor.submit(hash_single_file, file_info)
-                        future_to_file[future] = file_info[0]  # Store filepath
-                    
-                    self.log_event("CORE", f"Successfully submitted all {len(future_to_file)} files to ProcessPoolExecutor")
-                    self.status_updated.emit(f"Hashing {len(future_to_file)} files with {max_hash_cores} processes...")
-                    
-                    # Process results as they complete
-                    for future in as_completed(future_to_file):
-                        if self.cancelled:
-                            break
-                            
+                with ThreadPoolExecutor(max_workers=max_hash_threads) as hash_executor:
+                    with ThreadPoolExecutor(max_workers=max_scan_cores + 1) as scan_executor:
+                        scan_executor.submit(discover_folders)
+                        for core_id in range(max_scan_cores):
+                            scan_executor.submit(scan_folder_worker, core_id)
+                        
+                        # Consume scanned folders until every scan worker has signed off,
+                        # storing finished hashes in between
+                        workers_running = max_scan_cores
                         try:
-                            filepath, xxhash, process_id = future.result()
-                            completed += 1
-                            
-                            # Track which processes are being used
-                            if process_id not in processes_used:
-                                processes_used.add(process_id)
-                                self.log_event("CORE", f"Process {process_id} started working (Total active processes: {len(processes_used)})")
-                            
-                            if xxhash:
-                                hash_results.append((filepath, xxhash))
-                            
-                            # Update progress more frequently for better UI responsiveness
-                            if completed % 5 == 0 or completed == len(file_list):  # Update every 5 files
-                                progress_update_callback(completed, len(file_list))
-                                # Also update hash progress display
-                                self.hash_progress_updated.emit(completed, len(file_list))
-                                
-                            # Log progress and update status periodically
-                            if completed % 100 == 0:
-                                self.log_event("CORE", f"Progress: {completed}/{len(file_list)} files, using {len(processes_used)} processes")
-                                percentage = (completed / len(file_list)) * 100
-                                self.status_updated.emit(f"Hashing progress: {completed:,}/{len(file_list):,} files ({percentage:.1f}%)")
-                                
-                            if completed % 1000 == 0:
-                                self.status_updated.emit(f"Hashed {completed}/{len(file_list)} files ({(completed/len(file_list)*100):.1f}%)")
-                                
-                        except Exception as e:
-                            self.log_event("ERROR", f"Error processing file: {str(e)}")
-                            completed += 1
+                            while workers_running and not self.cancelled:
+                                try:
+                                    batch = files_queue.get(timeout=self.UI_UPDATE_INTERVAL)
+                                except Empty:
+                                    batch = ()
+                                if batch is None:
+                                    workers_running -= 1
+                                elif batch:
+                                    add_batch(*batch)
+                                    flush_hash_task()
+                                collect_results(self.max_pending_hashes)
+                                publish_progress()
+                        except Exception:
+                            # Stop the scan workers so the executor can shut down; cancelled
+                            # stays False, since this is a failure rather than a user cancel
+                            self._failed = True
+                            hash_executor.shutdown(wait=False, cancel_futures=True)
+                            raise
+                    discovering = False
                     
-                    # Log final process utilization
-                    self.log_event("CORE", f"ProcessPoolExecutor completed - Used {len(processes_used)} processes total")
+                    if self.cancelled:
+                        hash_executor.shutdown(wait=False, cancel_futures=True)
+                    else:
+                        file_count = len(all_paths)
+                        if self.skip_hashed:
+                            # Rows were kept for matching; drop those discovery did not confirm
+                            self._remove_unseen_files(all_paths)
+                            self.log_event("SCAN", f"Skip mode: Found {skipped_count} already hashed files, {file_count - skipped_count} files need hashing")
+                            self.status_updated.emit(f"Found {file_count} files, {file_count - skipped_count} need hashing (skipped {skipped_count})")
+                        else:
+                            self.log_event("SCAN", f"Completed file discovery: {file_count} files found")
+                        
+                        unique_size_rows = [i for i in first_of_size.values()
+                                            if size_counts[all_sizes[i]] == 1 and needs_hash[i]]
+                        self.log_event("SCAN", f"Size filter: {len(unique_size_rows)} files have a unique size and will not be hashed")
+                        
+                        self.log_event("CORE", f"File distribution: {large_count} large files (>50MB), {file_count - large_count} small files")
+                        
+                        flush_hash_task()
+                        collect_results(0)
+                        publish_progress(force=True)
                     
             except Exception as e:
-                self.log_event("ERROR", f"ProcessPoolExecutor failed: {str(e)}")
-                self.status_updated.emit(f"Error in parallel hashing: {str(e)}")
-                # Fall back to sequential processing if needed
-                hash_results = []
+                self._failed = True
+                self.log_event("ERROR", f"Parallel scanning failed: {str(e)}")
+                self.status_updated.emit(f"Scan failed: {str(e)}")
+                # The scan stopped part-way, so its rows are not stored as a finished scan
+                return
             
-            # Store results in database
-            hashed_files = []
-            for filepath, xxhash in hash_results:
-                if self.cancelled:
-                    return
-                    
-                # Find the original file info
-                file_info = next((f for f in all_files if f[0] == filepath), None)
-                if file_info:
-                    path, size, modified = file_info
-                    hashed_files.append((path, size, modified, xxhash))
-                    self._add_file_to_db(path, size, modified, xxhash)
+            # Rows hashed before a cancel are kept too, so a skip-hashed rescan can resume
+            self._add_files_to_db(pending_rows)
+            
+            # Unique-size files are recorded unhashed so they still show up in the workspace
+            # Rows are generated straight from the columns rather than built as a list first
+            self._add_files_to_db((all_paths[i], all_sizes[i], all_mtimes[i], None, None, None, "present")
+                                  for i in unique_size_rows)
+            hashed_files.extend((all_paths[i], all_sizes[i], all_mtimes[i], None) for i in unique_size_rows)
             
             if not self.cancelled:
-                # Log final process utilization summary  
-                total_processes_used = len(processes_used)
-                self.log_event("CORE", f"Hashing completed - Used {total_processes_used}/{max_hash_cores} processes total")
-                if total_processes_used < max_hash_cores:
-                    self.log_event("CORE", f"WARNING: Only {total_processes_used} processes were utilized out of {max_hash_cores} allocated")
+                self.log_event("CORE", f"Hashing completed - {completed} files on {max_hash_threads} threads")
                 
                 self.scan_completed.emit(hashed_files)
                 self.status_updated.emit(f"Scan completed. Processed {len(hashed_files)} files.")
@@ -539,25 +518,28 @@ class ScanThread(QThread):
                 
         except Exception as e:
             self.status_updated.emit(f"Error during scan: {str(e)}")
-            import traceback
-            print(f"Full error traceback: {traceback.format_exc()}")
+            self.log_event("ERROR", f"Full error traceback: {traceback.format_exc()}")
         finally:
             # Clear core activity display
             self.core_activity_updated.emit([])
             
             # Always close the thread connection
             if self.thread_conn:
+                try:
+                    self.thread_conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                except sqlite3.Error as e:
+                    # Best effort; it must not mask an error raised by the scan itself
+                    self.log_event("ERROR", f"WAL checkpoint failed: {e}")
                 self.thread_conn.close()
     
-    def _add_file_to_db(self, path: str, size: int, modified: int, xxhash: str, 
-                        md5: str = None, sha1: str = None, status: str = "present"):
-        """Add file to database using the thread's own connection."""
-        if not self.thread_conn:
+    def _add_files_to_db(self, rows):
+        """
+        Add (path, size, modified, xxhash, md5, sha1, status) rows to the database
+        in a single transaction, using the thread's own connection. rows may be any
+        iterable, including a generator.
+        """
+        if not self.thread_conn or not rows:
             return
             
-        cur = self.thread_conn.cursor()
-        cur.execute('''
-            INSERT OR REPLACE INTO files (path, size, modified, xxhash, md5, sha1, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (path, size, modified, xxhash, md5, sha1, status))
-        self.thread_conn.commit()
\ No newline at end of file
+        with self.thread_conn:
+            self.thread_conn.executemany(_UPSERT_SCAN_ROWS_SQL, rows)
\ No newline at end of file
@@ -1,199 +1,144 @@
-import os
-import threading
-import multiprocessing
+from functools import partial
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
-from typing import List, Tuple, Callable, Dict
-from dedup.hasher import compute_xxhash, compute_md5, compute_sha1
+from typing import List, Tuple, Callable, Optional, Iterator
+
+# Set once per worker process by _init_worker, so tasks only carry an index
+_worker_hash_func = None
+_worker_paths = ()
+
+def _init_worker(hash_func: Callable, paths: List[str]):
+    """Process pool initializer: receive the hash function and path list once per worker."""
+    global _worker_hash_func, _worker_paths
+    _worker_hash_func = hash_func
+    _worker_paths = paths
+
+def _hash_or_error(hash_func: Callable, path: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return (hash, None), or (None, error message) if hash_func raised. The error is
+    handed back rather than reported here, since a worker process cannot reach the
+    caller's callbacks, and one bad file must not end a map() over the batch.
+    """
+    try:
+        return hash_func(path), None
+    except Exception as e:
+        return None, str(e)
+
+def _hash_by_index(index: int) -> Tuple[Optional[str], Optional[str]]:
+    return _hash_or_error(_worker_hash_func, _worker_paths[index])
 
 class ParallelProcessor:
     def __init__(self, max_workers: int = 8):
         self.max_workers = max_workers
         self.large_file_threshold = 50 * 1024 * 1024  # 50MB
-        self.core_activity = {}  # Track what each core is doing
-        self.activity_lock = threading.Lock()
         
+    def _partition_by_size(self, files: List[Tuple[str, int, int]]) -> Tuple[List[int], List[int]]:
+        """
+        Split file indices into (large, small) around large_file_threshold in one pass.
+        Large indices come back biggest first, so the longest hashes start earliest
+        and the pool does not finish on one straggler.
+        """
+        large_idx = []
+        small_idx = []
+        threshold = self.large_file_threshold
+        for i, (_, size, _) in enumerate(files):
+            (large_idx if size >= threshold else small_idx).append(i)
+        large_idx.sort(key=lambda i: files[i][1], reverse=True)
+        return large_idx, small_idx
+    
     def process_files_parallel(self, files: List[Tuple[str, int, int]], 
                              hash_func: Callable, 
-                             progress_callback: Callable = None) -> List[Tuple[str, str]]:
+                             progress_callback: Callable = None,
+                             error_callback: Callable = None) -> List[Optional[str]]:
         """
         Process files in parallel using appropriate executors for large/small files.
-        Returns list of (filepath, hash) tuples.
+        Returns a list of hashes aligned with the input files (None where hashing failed).
+        error_callback, if given, is called as error_callback(path, message) for each failure.
+        Callers hash batch after batch through this, so small files stay on threads:
+        no process pool start-up or pickling is paid per call.
+        """
+        results = [None] * len(files)
+        for index, hash_result in self.iter_files_parallel(files, hash_func, progress_callback,
+                                                           small_files_in_processes=False,
+                                                           error_callback=error_callback):
+            results[index] = hash_result
+        return results
+    
+    def iter_files_parallel(self, files: List[Tuple[str, int, int]], 
+                            hash_func: Callable, 
+                            progress_callback: Callable = None,
+                            small_files_in_processes: bool = True,
+                            error_callback: Callable = None) -> Iterator[Tuple[int, Optional[str]]]:
         """
-        large_files = [(f, s, m) for f, s, m in files if s >= self.large_file_threshold]
-        small_files = [(f, s, m) for f, s, m in files if s < self.large_file_threshold]
+        Yield (index, hash) for each input file as soon as it completes; hash is None
+        where hashing failed, and error_callback(path, message) is called if given.
+        The pools keep hashing while the caller handles each result, so
+        callers can persist results without waiting for the whole batch.
+        Small files go to a process pool unless small_files_in_processes is False,
+        in which case they are hashed on threads and hash_func need not be picklable.
+        """
+        large_idx, small_idx = self._partition_by_size(files)
         
-        results = []
         total_files = len(files)
         processed = 0
         
-        # Process large files with ProcessPoolExecutor
-        if large_files:
-            with ProcessPoolExecutor(max_workers=min(4, self.max_workers)) as executor:
-                future_to_file = {
-                    executor.submit(hash_func, f[0]): f[0] 
-                    for f in large_files
-                }
+        def report(index, error):
+            if error_callback:
+                error_callback(files[index][0], error)
+        
+        # Process large files with ProcessPoolExecutor; the hash function and paths are
+        # shipped once per worker, so each task pickles only an int
+        if large_idx:
+            large_paths = [files[i][0] for i in large_idx]
+            with ProcessPoolExecutor(max_workers=min(4, self.max_workers),
+                                     initializer=_init_worker,
+                                     initargs=(hash_func, large_paths)) as executor:
+                # The input index rides on the future itself, so no future -> index dict is kept
+                futures = []
+                for j, i in enumerate(large_idx):
+                    future = executor.submit(_hash_by_index, j)
+                    future.file_index = i
+                    futures.append(future)
                 
-                for future in as_completed(future_to_file):
-                    filepath = future_to_file[future]
+                for future in as_completed(futures):
+                    index = future.file_index
                     try:
-                        hash_result = future.result()
-                        if hash_result:
-                            results.append((filepath, hash_result))
+                        hash_result, error = future.result()
                     except Exception as e:
-                        print(f"Error processing {filepath}: {e}")
+                        # The worker itself failed, e.g. its process died
+                        hash_result, error = None, str(e)
+                    if error:
+                        report(index, error)
                     
                     processed += 1
                     if progress_callback:
                         progress_callback(processed, total_files)
+                    yield index, hash_result
         
-        # Process small files with ThreadPoolExecutor
-        if small_files:
+        # Small files on threads: xxhash and file reads release the GIL
+        if small_idx and not small_files_in_processes:
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_file = {
-                    executor.submit(hash_func, f[0]): f[0] 
-                    for f in small_files
-                }
-                
-                for future in as_completed(future_to_file):
-                    filepath = future_to_file[future]
-                    try:
-                        hash_result = future.result()
-                        if hash_result:
-                            results.append((filepath, hash_result))
-                    except Exception as e:
-                        print(f"Error processing {filepath}: {e}")
-                    
+                results = executor.map(partial(_hash_or_error, hash_func), [files[i][0] for i in small_idx])
+                for index, (hash_result, error) in zip(small_idx, results):
+                    if error:
+                        report(index, error)
                     processed += 1
                     if progress_callback:
                         progress_callback(processed, total_files)
+                    yield index, hash_result
         
-        return results
-    
-    def process_files_with_core_tracking(self, files: List[Tuple[str, int, int]], 
-                                       hash_func: Callable,
-                                       core_callback: Callable = None,
-                                       progress_callback: Callable = None) -> List[Tuple[str, str]]:
-        """
-        Process files in parallel with detailed core activity tracking.
-        """
-        large_files = [(f, s, m) for f, s, m in files if s >= self.large_file_threshold]
-        small_files = [(f, s, m) for f, s, m in files if s < self.large_file_threshold]
-        
-        results = []
-        total_files = len(files)
-        processed = 0
-        
-        # Initialize core tracking
-        max_cores = min(self.max_workers, multiprocessing.cpu_count())
-        for i in range(max_cores):
-            self.core_activity[i] = {"status": "Idle", "file": None}
-        
-        if core_callback:
-            self._update_core_display(core_callback)
-        
-        # Process large files with ProcessPoolExecutor (2-4 cores as per design)
-        if large_files:
-            large_cores = min(4, max(2, max_cores // 2))
-            
-            with ProcessPoolExecutor(max_workers=large_cores) as executor:
-                # Submit all large files
-                future_to_file = {}
-                for i, file_info in enumerate(large_files):
-                    if len(future_to_file) < large_cores:  # Don't overwhelm
-                        future = executor.submit(hash_func, file_info[0])
-                        future_to_file[future] = (file_info[0], i % large_cores)
-                        
-                        # Update core status
-                        core_id = i % large_cores
-                        self.core_activity[core_id] = {"status": "Hashing (Large)", "file": file_info[0]}
-                        
-                        if core_callback:
-                            self._update_core_display(core_callback)
-                
-                # Process completed futures
-                for future in as_completed(future_to_file):
-                    filepath, core_id = future_to_file[future]
-                    
-                    try:
-                        hash_result = future.result()
-                        if hash_result:
-                            results.append((filepath, hash_result))
-                    except Exception as e:
-                        print(f"Error processing {filepath}: {e}")
-                    
-                    # Mark core as idle
-                    self.core_activity[core_id] = {"status": "Idle", "file": None}
-                    
+        # Process small files with ProcessPoolExecutor.map: chunksize hands each worker
+        # runs of indices, so per-file cost is a loop step rather than a future and a pipe trip
+        elif small_idx:
+            small_paths = [files[i][0] for i in small_idx]
+            chunksize = max(1, len(small_idx) // (self.max_workers * 4))
+            with ProcessPoolExecutor(max_workers=self.max_workers,
+                                     initializer=_init_worker,
+                                     initargs=(hash_func, small_paths)) as executor:
+                results = executor.map(_hash_by_index, range(len(small_idx)), chunksize=chunksize)
+                for index, (hash_result, error) in zip(small_idx, results):
+                    if error:
+                        report(index, error)
                     processed += 1
                     if progress_callback:
                         progress_callback(processed, total_files)
-                    if core_callback:
-                        self._update_core_display(core_callback)
-        
-        # Process small files with ThreadPoolExecutor (up to 8 cores)
-        if small_files:
-            small_cores = min(self.max_workers, max_cores)
-            
-            with ThreadPoolExecutor(max_workers=small_cores) as executor:
-                # Submit small files in batches
-                future_to_file = {}
-                file_index = 0
-                
-                while file_index < len(small_files) or future_to_file:
-                    # Submit new files if we have capacity
-                    while len(future_to_file) < small_cores and file_index < len(small_files):
-                        file_info = small_files[file_index]
-                        future = executor.submit(hash_func, file_info[0])
-                        core_id = file_index % small_cores
-                        future_to_file[future] = (file_info[0], core_id)
-                        
-                        # Update core status
-                        self.core_activity[core_id] = {"status": "Hashing (Small)", "file": file_info[0]}
-                        
-                        file_index += 1
-                        if core_callback:
-                            self._update_core_display(core_callback)
-                    
-                    # Wait for at least one to complete
-                    if future_to_file:
-                        done_futures = []
-                        for future in list(future_to_file.keys()):
-                            if future.done():
-                                done_futures.append(future)
-                        
-                        if not done_futures:
-                            # Wait for first one to complete
-                            done_futures = [next(as_completed(future_to_file.keys(), timeout=0.1))]
-                        
-                        for future in done_futures:
-                            filepath, core_id = future_to_file.pop(future)
-                            
-                            try:
-                                hash_result = future.result()
-                                if hash_result:
-                                    results.append((filepath, hash_result))
-                            except Exception as e:
-                                print(f"Error processing {filepath}: {e}")
-                            
-                            # Mark core as idle
-                            self.core_activity[core_id] = {"status": "Idle", "file": None}
-                            
-                            processed += 1
-                            if progress_callback:
-                                progress_callback(processed, total_files)
-                            if core_callback:
-                                self._update_core_display(core_callback)
-        
-        return results
-    
-    def _update_core_display(self, core_callback):
-        """Update the UI with current core activity."""
-        with self.activity_lock:
-            core_data = []
-            for core_id, activity in self.core_activity.items():
-                status = activity["status"]
-                current_file = activity["file"]
-                core_data.append((core_id, status, current_file))
-            
-            core_callback(core_data)
\ No newline at end of file
+                    yield index, hash_result
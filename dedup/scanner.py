@@ -1,7 +1,40 @@
 import os
 from typing import List, Tuple, Callable, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+
+# os.cpu_count() reads /proc on every call, so look it up once
+_CPU_COUNT = os.cpu_count() or 1
+
+def _collect_files(directory: str, files: List[Tuple[str, int, int]]):
+    """
+    Append (path, size, modified_time) for every regular file below directory to files.
+    Uses os.scandir directly, so the file type comes from the directory listing and
+    each stat is taken from the DirEntry rather than a separate os.stat of the joined path.
+    Symlinks are neither followed nor reported.
+    """
+    # Hot loop: bound methods are looked up once, files (the common case) are tested
+    # before folders, and rows go straight into the caller's list instead of through
+    # a generator frame
+    add_file = files.append
+    pending = [directory]
+    add_folder = pending.append
+    scandir = os.scandir
+    while pending:
+        try:
+            entries = scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    add_file((entry.path, stat.st_size, int(stat.st_mtime)))
+                elif entry.is_dir(follow_symlinks=False):
+                    add_folder(entry.path)
 
 def scan_directories(directories: List[str]) -> List[Tuple[str, int, int]]:
     """
@@ -9,94 +42,74 @@ def scan_directories(directories: List[str]) -> List[Tuple[str, int, int]]:
     """
     files = []
     for directory in directories:
-        for root, _, filenames in os.walk(directory):
-            for filename in filenames:
-                path = os.path.join(root, filename)
-                try:
-                    stat = os.stat(path)
-                    files.append((path, stat.st_size, int(stat.st_mtime)))
-                except Exception:
-                    continue
+        _collect_files(directory, files)
+    return files
+
+def _scan_subtree(root: str) -> List[Tuple[str, int, int]]:
+    """Process pool task: scan one subtree. Module level so it pickles by name."""
+    files = []
+    _collect_files(root, files)
     return files
 
+def _shard_directories(directories: List[str]) -> Tuple[List[str], List[Tuple[str, int, int]]]:
+    """
+    Split each directory into its immediate subdirectories, so one deep tree still
+    spreads over several workers. Returns (subtree roots, files directly in the directories).
+    """
+    roots = []
+    top_files = []
+    for directory in directories:
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    roots.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    top_files.append((entry.path, stat.st_size, int(stat.st_mtime)))
+    return roots, top_files
+
 def scan_directories_parallel(directories: List[str], 
                             progress_callback: Optional[Callable] = None,
-                            core_callback: Optional[Callable] = None) -> List[Tuple[str, int, int]]:
+                            core_callback: Optional[Callable] = None,
+                            max_workers: Optional[int] = None) -> List[Tuple[str, int, int]]:
     """
-    Scans directories in parallel using multiple cores.
+    Scans directories in parallel using multiple processes, one subtree per task.
+    At most max_workers processes are used (default: one per CPU).
     """
     if not directories:
         return []
     
-    max_workers = min(8, multiprocessing.cpu_count(), len(directories))
-    all_files = []
+    roots, top_files = _shard_directories(directories)
+    if not roots:
+        return top_files
     
-    def scan_single_directory(directory_info):
-        """Scan a single directory and return (directory, files_list)."""
-        directory, core_id = directory_info
-        directory_files = []
-        
-        try:
-            for root, _, filenames in os.walk(directory):
-                for filename in filenames:
-                    path = os.path.join(root, filename)
-                    try:
-                        stat = os.stat(path)
-                        directory_files.append((path, stat.st_size, int(stat.st_mtime)))
-                    except Exception:
-                        continue
-        except Exception:
-            pass
-        
-        return directory, directory_files, core_id
+    max_workers = min(max_workers or _CPU_COUNT, _CPU_COUNT, len(roots))
     
-    # Prepare directory assignments with core IDs
-    directory_assignments = [(dir_path, i % max_workers) for i, dir_path in enumerate(directories)]
+    def running_roots(start):
+        """Core status while roots[start:] are still queued or being scanned."""
+        return [(i, "Scanning", roots[start + i]) if start + i < len(roots) else (i, "Idle", None)
+                for i in range(max_workers)]
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all directories
-        future_to_dir = {
-            executor.submit(scan_single_directory, assignment): assignment[0] 
-            for assignment in directory_assignments
-        }
-        
-        # Update initial core status
+    subtree_files = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
         if core_callback:
-            core_data = [(i, "Scanning" if i < len(directories) else "Idle", 
-                         directories[i] if i < len(directories) else None) 
-                         for i in range(max_workers)]
-            core_callback(core_data)
-        
-        completed_dirs = 0
+            core_callback(running_roots(0))
         
-        # Process completed scans
-        for future in as_completed(future_to_dir):
-            directory_path = future_to_dir[future]
-            
-            try:
-                directory, directory_files, core_id = future.result()
-                all_files.extend(directory_files)
-                completed_dirs += 1
-                
-                if progress_callback:
-                    progress_callback(f"Scanned {directory}: {len(directory_files)} files", 
-                                    completed_dirs, len(directories))
-                
-                if core_callback:
-                    # Update core status
-                    core_data = []
-                    for i in range(max_workers):
-                        if i == core_id:
-                            core_data.append((i, "Completed", None))
-                        elif completed_dirs + i < len(directories):
-                            core_data.append((i, "Scanning", directories[completed_dirs + i]))
-                        else:
-                            core_data.append((i, "Idle", None))
-                    core_callback(core_data)
-                    
-            except Exception as e:
-                if progress_callback:
-                    progress_callback(f"Error scanning {directory_path}: {str(e)}", 
-                                    completed_dirs, len(directories))
+        # map yields in submission order, so the roots after the last finished one
+        # are the ones still running
+        results = executor.map(_scan_subtree, roots, chunksize=1)
+        for completed, (root, files) in enumerate(zip(roots, results), 1):
+            subtree_files.append(files)
+            if progress_callback:
+                progress_callback(f"Scanned {root}: {len(files)} files", completed, len(roots))
+            if core_callback:
+                core_callback(running_roots(completed))
     
-    return all_files
+    return top_files + list(itertools.chain.from_iterable(subtree_files))
@@ -1,113 +1,325 @@
 import os
 import sqlite3
 import json
-from typing import List, Dict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import groupby
+from operator import attrgetter
+from typing import List, Dict, Iterator, Optional, Tuple
+from dedup.hasher import DEFAULT_XXHASH_ALGO, LEGACY_XXHASH_ALGO
+
+FILE_COLUMNS = ('path', 'size', 'modified', 'xxhash', 'md5', 'sha1', 'status', 'fastdigest')
+DISPLAY_COLUMNS = ('path', 'size', 'modified', 'xxhash', 'status')
+HASH_COLUMNS = ('xxhash', 'md5', 'sha1', 'fastdigest')
+
+def upsert_files_sql(columns: Tuple[str, ...] = FILE_COLUMNS) -> str:
+    """
+    Build an UPSERT of the given files columns keyed on path. When size and mtime
+    match the stored row, digests missing from the new row are kept; otherwise the
+    new row replaces the stored one and every digest it does not carry, including
+    columns left out of columns, is cleared. Rows that would not change are not rewritten.
+    """
+    same_file = 'files.size = excluded.size AND files.modified = excluded.modified'
+    assignments = [f'{c} = excluded.{c}' for c in ('size', 'modified', 'status') if c in columns]
+    unchanged = [same_file, 'files.status IS excluded.status']
+    for c in HASH_COLUMNS:
+        new = f'excluded.{c}' if c in columns else 'NULL'
+        assignments.append(f'{c} = CASE WHEN {same_file} THEN coalesce({new}, files.{c}) ELSE {new} END')
+        unchanged.append(f'coalesce({new}, files.{c}) IS files.{c}')
+    return f'''
+        INSERT INTO files ({', '.join(columns)})
+        VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT(path) DO UPDATE SET {', '.join(assignments)}
+        WHERE NOT ({' AND '.join(unchanged)})
+    '''
+
+UPSERT_FILES_SQL = upsert_files_sql()
+
+@dataclass(slots=True, eq=False)
+class FileRec:
+    """A row of the files table. Slots keep per-record memory small on large workspaces."""
+    path: str
+    size: int
+    modified: int
+    xxhash: Optional[str] = None
+    md5: Optional[str] = None
+    sha1: Optional[str] = None
+    status: str = "present"
+    fastdigest: Optional[str] = None
+
+    def as_row(self) -> tuple:
+        """Column values in FILE_COLUMNS order, as accepted by add_files_bulk."""
+        return (self.path, self.size, self.modified, self.xxhash,
+                self.md5, self.sha1, self.status, self.fastdigest)
 
 class Workspace:
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Autocommit mode: single statements commit on their own and batched writes
+        # use transaction(), so there is no implicit transaction left open between calls
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        # WAL lets scan threads write while the GUI reads, and NORMAL sync
+        # avoids an fsync on every commit
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        # Read pages through a memory map instead of read() calls, with a 64MB page cache
+        self.conn.execute('PRAGMA mmap_size=268435456')
+        self.conn.execute('PRAGMA cache_size=-65536')
         self._init_db()
 
+    @contextmanager
+    def transaction(self):
+        """
+        Run the enclosed statements as one BEGIN IMMEDIATE ... COMMIT write transaction,
+        rolled back on error. Inside an open transaction this simply joins it.
+        """
+        if self.conn.in_transaction:
+            yield self.conn
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
     def _init_db(self):
         cur = self.conn.cursor()
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS files (
-                id INTEGER PRIMARY KEY,
-                path TEXT UNIQUE,
+        # One transaction, so a half-finished upgrade never leaves a broken schema behind
+        with self.transaction():
+            cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'files'")
+            row = cur.fetchone()
+            if row is None:
+                self._create_files_table(cur, 'files')
+            else:
+                # Upgrade workspaces created before these columns existed
+                self._ensure_column(cur, 'files', 'fastdigest', 'TEXT')
+                if 'WITHOUT ROWID' not in row[0].upper():
+                    self._rebuild_files_table(cur)
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS workspace_config (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS workspace_metadata (
+                    id INTEGER PRIMARY KEY,
+                    workspace_name TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_scan TIMESTAMP,
+                    total_files INTEGER DEFAULT 0,
+                    total_size INTEGER DEFAULT 0,
+                    duplicate_groups INTEGER DEFAULT 0
+                )
+            ''')
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS workspace_directories (
+                    id INTEGER PRIMARY KEY,
+                    directory_path TEXT,
+                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_scanned TIMESTAMP
+                )
+            ''')
+            # Create indexes for better performance. Only hashed rows can form duplicate groups,
+            # so the xxhash index is partial; (size, xxhash) covers the size pre-filter and the
+            # unhashed check, which also makes a plain size index redundant.
+            cur.execute('DROP INDEX IF EXISTS idx_files_xxhash')
+            cur.execute('DROP INDEX IF EXISTS idx_files_size')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_files_xxhash_nn ON files(xxhash) WHERE xxhash IS NOT NULL')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_files_md5 ON files(md5)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_files_size_xxhash ON files(size, xxhash)')
+            # Workspaces that already hold hashes but no algorithm predate XXH3
+            cur.execute('SELECT value FROM workspace_config WHERE key = ?', ('hash_algo',))
+            if cur.fetchone() is None:
+                cur.execute('SELECT 1 FROM files WHERE xxhash IS NOT NULL LIMIT 1')
+                algo = LEGACY_XXHASH_ALGO if cur.fetchone() else DEFAULT_XXHASH_ALGO
+                cur.execute('INSERT INTO workspace_config (key, value) VALUES (?, ?)', ('hash_algo', algo))
+            # Older workspaces also kept the directories as a JSON list in workspace_config;
+            # move it into workspace_directories once and drop it
+            cur.execute('SELECT value FROM workspace_config WHERE key = ?', ('directories',))
+            row = cur.fetchone()
+            if row is not None:
+                cur.execute('SELECT 1 FROM workspace_directories LIMIT 1')
+                if cur.fetchone() is None:
+                    cur.executemany('INSERT INTO workspace_directories (directory_path) VALUES (?)',
+                                    [(directory,) for directory in json.loads(row[0])])
+                cur.execute('DELETE FROM workspace_config WHERE key = ?', ('directories',))
+
+    def _create_files_table(self, cur, name: str):
+        # Keyed by path without a rowid, so lookups and upserts by path
+        # touch one B-tree instead of a path index plus the rowid table
+        cur.execute(f'''
+            CREATE TABLE {name} (
+                path TEXT PRIMARY KEY,
                 size INTEGER,
                 modified INTEGER,
                 xxhash TEXT,
                 md5 TEXT,
                 sha1 TEXT,
                 status TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS workspace_config (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        ''')
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS workspace_metadata (
-                id INTEGER PRIMARY KEY,
-                workspace_name TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_scan TIMESTAMP,
-                total_files INTEGER DEFAULT 0,
-                total_size INTEGER DEFAULT 0,
-                duplicate_groups INTEGER DEFAULT 0
-            )
+                fastdigest TEXT
+            ) WITHOUT ROWID
         ''')
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS workspace_directories (
-                id INTEGER PRIMARY KEY,
-                directory_path TEXT,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_scanned TIMESTAMP
-            )
-        ''')
-        # Create indexes for better performance
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_files_xxhash ON files(xxhash)')
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_files_md5 ON files(md5)')
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_files_size ON files(size)')
-        self.conn.commit()
 
-    def add_file(self, path: str, size: int, modified: int, xxhash: str, md5: str = None, sha1: str = None, status: str = "present"):
+    def _rebuild_files_table(self, cur):
+        """Move an old rowid files table (id plus UNIQUE path) to the WITHOUT ROWID layout."""
+        columns = ', '.join(FILE_COLUMNS + ('created_at',))
+        self._create_files_table(cur, 'files_new')
+        cur.execute(f'INSERT OR REPLACE INTO files_new ({columns}) '
+                    f'SELECT {columns} FROM files WHERE path IS NOT NULL')
+        cur.execute('DROP TABLE files')
+        cur.execute('ALTER TABLE files_new RENAME TO files')
+
+    def _ensure_column(self, cur, table: str, column: str, decl: str):
+        """Add a column to an existing table if it is missing."""
+        cur.execute(f'PRAGMA table_info({table})')
+        if column not in [row[1] for row in cur.fetchall()]:
+            cur.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+    def add_file(self, path: str, size: int, modified: int, xxhash: str, md5: str = None, sha1: str = None, status: str = "present",
+                 fastdigest: str = None):
+        # Callers with more than one file should use add_files_bulk, which commits once
+        self.add_files_bulk([(path, size, modified, xxhash, md5, sha1, status, fastdigest)])
+
+    def add_files_bulk(self, rows: List[tuple]):
+        """
+        Insert or update many files in a single transaction (see upsert_files_sql).
+        Each row is (path, size, modified, xxhash, md5, sha1, status, fastdigest).
+        """
+        if not rows:
+            return
+        with self.transaction():
+            self.conn.executemany(UPSERT_FILES_SQL, rows)
+
+    def update_hashes(self, column: str, rows: List[tuple]):
+        """
+        Set a single hash column for many files in one transaction.
+        Each row is (value, path); other columns are left untouched.
+        """
+        if column not in HASH_COLUMNS:
+            raise ValueError(f"Unknown hash column: {column}")
+        if not rows:
+            return
+        with self.transaction():
+            self.conn.executemany(f'UPDATE files SET {column} = ? WHERE path = ?', rows)
+
+    def get_files(self) -> List[FileRec]:
         cur = self.conn.cursor()
-        # Update or insert file
-        cur.execute('''
-            INSERT OR REPLACE INTO files (path, size, modified, xxhash, md5, sha1, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (path, size, modified, xxhash, md5, sha1, status))
-        self.conn.commit()
+        cur.row_factory = self._file_rec_factory
+        cur.execute(f"SELECT {', '.join(FILE_COLUMNS)} FROM files")
+        return cur.fetchall()
+
+    def count_files(self) -> int:
+        cur = self.conn.cursor()
+        cur.execute('SELECT COUNT(*) FROM files')
+        return cur.fetchone()[0]
 
-    def get_files(self) -> List[dict]:
+    def get_files_columns(self, columns: Tuple[str, ...] = DISPLAY_COLUMNS, offset: int = 0,
+                          limit: int = -1) -> Tuple[list, ...]:
+        """
+        Return files ordered by path as one list per requested column (struct of arrays),
+        starting at row offset. A negative limit returns all remaining rows.
+        """
+        unknown = set(columns) - set(FILE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown file columns: {', '.join(sorted(unknown))}")
         cur = self.conn.cursor()
-        cur.execute('SELECT * FROM files')
+        cur.execute(f"SELECT {', '.join(columns)} FROM files ORDER BY path LIMIT ? OFFSET ?",
+                    (limit, offset))
         rows = cur.fetchall()
-        return [dict(zip([column[0] for column in cur.description], row)) for row in rows]
+        if not rows:
+            return tuple([] for _ in columns)
+        return tuple(list(column) for column in zip(*rows))
 
-    def save_directories(self, directories: List[str]):
-        """Save the list of directories to the workspace."""
+    def iter_files(self, batch_size: int = 4096, shared_size_only: bool = False,
+                   unhashed_only: bool = False) -> Iterator[FileRec]:
+        """
+        Yield files one at a time, fetching batch_size rows from SQLite per round-trip.
+        With shared_size_only, files whose size is unique in the workspace are skipped
+        since they cannot have a duplicate. With unhashed_only, only files without an
+        xxHash are returned.
+        """
+        conditions = []
+        if shared_size_only:
+            conditions.append('''size IN (
+                    SELECT size FROM files
+                    GROUP BY size
+                    HAVING COUNT(*) > 1
+                )''')
+        if unhashed_only:
+            conditions.append('xxhash IS NULL')
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         cur = self.conn.cursor()
-        
-        # Clear existing directories
-        cur.execute('DELETE FROM workspace_directories')
-        
-        # Insert new directories
-        for directory in directories:
-            cur.execute('''
+        cur.execute(f"SELECT {', '.join(FILE_COLUMNS)} FROM files {where}")
+        yield from self._iter_rows(cur, batch_size)
+
+    def iter_duplicate_hash_groups(self, batch_size: int = 4096) -> Iterator[List[FileRec]]:
+        """
+        Yield lists of files that share an xxHash. The grouping runs inside SQLite
+        on idx_files_xxhash_nn, so only files with a duplicate hash reach Python.
+        """
+        cur = self.conn.cursor()
+        cur.execute(f'''
+            SELECT {', '.join(FILE_COLUMNS)} FROM files
+            WHERE xxhash IN (
+                SELECT xxhash FROM files
+                WHERE xxhash IS NOT NULL
+                GROUP BY xxhash
+                HAVING COUNT(*) > 1
+            )
+            ORDER BY xxhash
+        ''')
+        for _, group in groupby(self._iter_rows(cur, batch_size), key=attrgetter('xxhash')):
+            yield list(group)
+
+    @staticmethod
+    def _file_rec_factory(cursor, row: tuple) -> FileRec:
+        """Cursor row_factory building FileRec straight from a FILE_COLUMNS row."""
+        return FileRec(*row)
+
+    @classmethod
+    def _iter_rows(cls, cur, batch_size: int) -> Iterator[FileRec]:
+        cur.row_factory = cls._file_rec_factory
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    def get_existing_digests(self, paths: List[str]) -> Dict[str, tuple]:
+        """Return {path: (size, modified, xxhash)} for those paths already in the workspace."""
+        cur = self.conn.cursor()
+        existing = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            cur.execute(f'SELECT path, size, modified, xxhash FROM files WHERE path IN ({placeholders})', chunk)
+            for path, size, modified, xxhash in cur.fetchall():
+                existing[path] = (size, modified, xxhash)
+        return existing
+
+    def save_directories(self, directories: List[str]):
+        """Save the list of directories to the workspace in a single transaction."""
+        with self.transaction():
+            # Clear existing directories
+            self.conn.execute('DELETE FROM workspace_directories')
+            
+            # Insert new directories
+            self.conn.executemany('''
                 INSERT INTO workspace_directories (directory_path)
                 VALUES (?)
-            ''', (directory,))
-        
-        # Also keep the old method for backward compatibility
-        cur.execute('''
-            INSERT OR REPLACE INTO workspace_config (key, value)
-            VALUES (?, ?)
-        ''', ('directories', json.dumps(directories)))
-        
-        self.conn.commit()
+            ''', [(directory,) for directory in directories])
 
     def load_directories(self) -> List[str]:
         """Load the list of directories from the workspace."""
         cur = self.conn.cursor()
-        
-        # Try new method first
         cur.execute('SELECT directory_path FROM workspace_directories ORDER BY added_at')
-        rows = cur.fetchall()
-        if rows:
-            return [row[0] for row in rows]
-        
-        # Fall back to old method for backward compatibility
-        cur.execute('SELECT value FROM workspace_config WHERE key = ?', ('directories',))
-        row = cur.fetchone()
-        if row:
-            return json.loads(row[0])
-        return []
+        return [row[0] for row in cur.fetchall()]
     
     def update_workspace_metadata(self, name: str = None):
         """Update workspace metadata with current stats."""
@@ -121,7 +333,7 @@ class Workspace:
         # Count duplicate groups (files with same xxhash that appear more than once)
         cur.execute('''
             SELECT COUNT(*) FROM (
-                SELECT xxhash FROM files 
+                SELECT 1 FROM files 
                 WHERE xxhash IS NOT NULL 
                 GROUP BY xxhash 
                 HAVING COUNT(*) > 1
@@ -135,8 +347,6 @@ class Workspace:
             (id, workspace_name, last_scan, total_files, total_size, duplicate_groups)
             VALUES (1, ?, CURRENT_TIMESTAMP, ?, ?, ?)
         ''', (name or os.path.basename(self.db_path), total_files, total_size, duplicate_groups))
-        
-        self.conn.commit()
     
     def get_workspace_stats(self) -> Dict:
         """Get workspace statistics."""
@@ -157,11 +367,37 @@ class Workspace:
             'last_scan': None
         }
 
+    @property
+    def hash_algo(self) -> str:
+        """The xxHash variant used for digests stored in this workspace."""
+        cur = self.conn.cursor()
+        cur.execute('SELECT value FROM workspace_config WHERE key = ?', ('hash_algo',))
+        row = cur.fetchone()
+        return row[0] if row else LEGACY_XXHASH_ALGO
+
+    def set_hash_algo(self, algo: str):
+        """Record which xxHash variant the stored digests were computed with."""
+        cur = self.conn.cursor()
+        cur.execute('''
+            INSERT OR REPLACE INTO workspace_config (key, value)
+            VALUES (?, ?)
+        ''', ('hash_algo', algo))
+
     def clear_files(self):
         """Clear all files from the workspace."""
-        cur = self.conn.cursor()
-        cur.execute('DELETE FROM files')
-        self.conn.commit()
+        with self.transaction():
+            self.conn.execute('DELETE FROM files')
+            # No stored digests are left, so new scans can use the current algorithm
+            self.set_hash_algo(DEFAULT_XXHASH_ALGO)
+
+    def copy_to(self, workspace_path: str) -> 'Workspace':
+        """Copy the whole workspace to a new file with SQLite's backup API and open the copy."""
+        dest = sqlite3.connect(workspace_path)
+        try:
+            self.conn.backup(dest)
+        finally:
+            dest.close()
+        return Workspace(workspace_path)
 
     @staticmethod
     def create_workspace(workspace_path: str) -> 'Workspace':
@@ -0,0 +1,25 @@
+import unittest
+
+from dedup.parallel_processor import ParallelProcessor
+
+
+def _failing_hash(path):
+    if path.endswith('bad'):
+        raise OSError('unreadable')
+    return 'h-' + path
+
+
+class ErrorReportingTest(unittest.TestCase):
+    """Hashing errors reach the caller's callback instead of stdout."""
+
+    def test_errors_go_to_error_callback(self):
+        files = [('good', 10, 0), ('bad', 10, 0), ('also-good', 20, 0)]
+        errors = []
+        results = ParallelProcessor(max_workers=2).process_files_parallel(
+            files, _failing_hash, error_callback=lambda path, error: errors.append((path, error)))
+        self.assertEqual(results, ['h-good', None, 'h-also-good'])
+        self.assertEqual(errors, [('bad', 'unreadable')])
+
+
+if __name__ == '__main__':
+    unittest.main()
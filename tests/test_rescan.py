@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication, QMessageBox
+import dedup.gui.scan_thread as scan_thread
+from dedup.gui import MainWindow
+
+
+class SkipHashedRescanTest(unittest.TestCase):
+    """Rescans with the skip box ticked must reuse stored hashes for unchanged files."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.config_dir = tempfile.TemporaryDirectory()
+        # Keep QSettings (recent workspaces) away from the user's real configuration
+        os.environ['XDG_CONFIG_HOME'] = cls.config_dir.name
+        cls.app = QApplication.instance() or QApplication(sys.argv)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.config_dir.cleanup()
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self.tmpdir.name, 'data')
+        os.makedirs(os.path.join(self.data_dir, 'sub'))
+        # Every size occurs twice, so all files are hashing candidates
+        contents = {'a1': b'a' * 1000, 'a2': b'a' * 1000, 'b1': b'b' * 50,
+                    os.path.join('sub', 'b2'): b'c' * 50}
+        for name, data in contents.items():
+            with open(os.path.join(self.data_dir, name), 'wb') as f:
+                f.write(data)
+
+        patcher = mock.patch.object(QMessageBox, 'information')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.window = MainWindow()
+        self.window._save_workspace_to_path(os.path.join(self.tmpdir.name, 'test.dedupe'))
+        self.window.directories = [self.data_dir]
+        self.window.skip_hashed_checkbox.setChecked(True)
+
+    def tearDown(self):
+        if self.window.workspace:
+            self.window.workspace.close()
+        self.window.close()
+        self.tmpdir.cleanup()
+
+    def _scan(self) -> int:
+        """Run one scan through the window and return how many files were hashed."""
+        hashed = []
+        real_hash = scan_thread.compute_xxhash
+
+        def counting_hash(path, *args, **kwargs):
+            hashed.append(path)
+            return real_hash(path, *args, **kwargs)
+
+        with mock.patch.object(scan_thread, 'compute_xxhash', counting_hash):
+            self.window.start_scan()
+            deadline = time.monotonic() + 30
+            while ((self.window.scan_thread.isRunning() or not self.window.scan_btn.isEnabled())
+                   and time.monotonic() < deadline):
+                self.app.processEvents()
+                time.sleep(0.01)
+            self.app.processEvents()
+        return len(hashed)
+
+    def _stored(self):
+        return {f.path: f.xxhash for f in self.window.workspace.get_files()}
+
+    def test_second_scan_hashes_nothing(self):
+        self.assertEqual(self._scan(), 4)
+        first = self._stored()
+        self.assertEqual(self._scan(), 0)
+        self.assertEqual(self._stored(), first)
+
+    def test_rescan_drops_removed_files(self):
+        self._scan()
+        os.remove(os.path.join(self.data_dir, 'a2'))
+        self.assertEqual(self._scan(), 0)
+        self.assertNotIn(os.path.join(self.data_dir, 'a2'), self._stored())
+        self.assertEqual(len(self._stored()), 3)
+
+    def test_rescan_keeps_files_of_missing_directory(self):
+        self._scan()
+        first = self._stored()
+        # An unmounted drive looks like a missing directory; its hashes must survive
+        os.rename(self.data_dir, self.data_dir + '.offline')
+        self.assertEqual(self._scan(), 0)
+        self.assertEqual(self._stored(), first)
+
+    def test_unticked_rescan_hashes_everything(self):
+        self._scan()
+        self.window.skip_hashed_checkbox.setChecked(False)
+        self.assertEqual(self._scan(), 4)
+
+    def test_failed_scan_is_not_reported_as_cancelled(self):
+        self._scan()
+        first = self._stored()
+        with mock.patch.object(scan_thread.ScanThread, '_filter_unhashed_files',
+                               side_effect=sqlite3.OperationalError('disk I/O error')):
+            self._scan()
+        self.assertFalse(self.window.scan_thread.cancelled)
+        self.assertTrue(self.window.status_label.text().startswith('Scan failed'))
+        self.assertEqual(self._stored(), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
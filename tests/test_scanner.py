@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from dedup.scanner import scan_directories, scan_directories_parallel
+from dedup.gui.scan_thread import ScanThread
+from dedup.workspace import Workspace
+
+
+@unittest.skipUnless(hasattr(os, 'symlink'), 'symlinks not supported')
+class SymlinkPolicyTest(unittest.TestCase):
+    """The engine scanner and the GUI scan thread skip symlinks the same way."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        root = self.root = os.path.join(self.tmpdir.name, 'data')
+        outside = os.path.join(self.tmpdir.name, 'outside')
+        os.makedirs(os.path.join(root, 'sub'))
+        os.makedirs(outside)
+        for path, data in ((os.path.join(root, 'a'), b'a' * 10),
+                           (os.path.join(root, 'sub', 'b'), b'b' * 10),
+                           (os.path.join(outside, 'c'), b'c' * 10)):
+            with open(path, 'wb') as f:
+                f.write(data)
+        os.symlink(os.path.join(root, 'a'), os.path.join(root, 'link_to_file'))
+        os.symlink(outside, os.path.join(root, 'link_to_dir'))
+        os.symlink(os.path.join(root, 'missing'), os.path.join(root, 'broken_link'))
+        self.expected = {os.path.join(root, 'a'), os.path.join(root, 'sub', 'b')}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_scanner_skips_symlinks(self):
+        self.assertEqual({f[0] for f in scan_directories([self.root])}, self.expected)
+
+    def test_scan_thread_skips_symlinks(self):
+        workspace_path = os.path.join(self.tmpdir.name, 'test.dedupe')
+        Workspace(workspace_path).close()
+        thread = ScanThread([self.root], workspace_path)
+        completed = []
+        thread.scan_completed.connect(completed.extend)
+        # Run in this thread; the pipeline's own workers still run in the background
+        thread.run()
+        self.assertEqual({f[0] for f in completed}, self.expected)
+
+
+class ParallelScanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+        for i in range(3):
+            folder = os.path.join(self.root, f'd{i}', 'nested')
+            os.makedirs(folder)
+            for name in ('x', 'y'):
+                with open(os.path.join(folder, name), 'wb') as f:
+                    f.write(name.encode() * (i + 1))
+        with open(os.path.join(self.root, 'top'), 'wb') as f:
+            f.write(b'top')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_matches_serial_scan(self):
+        serial = sorted(scan_directories([self.root]))
+        self.assertEqual(len(serial), 7)
+        self.assertEqual(sorted(scan_directories_parallel([self.root], max_workers=2)), serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
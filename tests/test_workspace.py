@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from dedup.workspace import Workspace, FILE_COLUMNS, upsert_files_sql
+
+
+class UpsertFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.workspace = Workspace(os.path.join(self.tmpdir.name, 'test.dedupe'))
+
+    def tearDown(self):
+        self.workspace.close()
+        self.tmpdir.cleanup()
+
+    def _row(self, path):
+        return [f for f in self.workspace.get_files() if f.path == path][0]
+
+    def test_unchanged_file_keeps_digests(self):
+        self.workspace.add_files_bulk([('/a', 1, 1, 'x', 'm', None, 'present', 'fd1')])
+        self.workspace.add_files_bulk([('/a', 1, 1, None, None, None, 'present', None)])
+        row = self._row('/a')
+        self.assertEqual((row.xxhash, row.md5, row.fastdigest), ('x', 'm', 'fd1'))
+
+    def test_changed_file_clears_digests(self):
+        self.workspace.add_files_bulk([('/a', 1, 1, 'x', 'm', 's', 'present', 'fd1')])
+        self.workspace.add_files_bulk([('/a', 1, 2, 'y', None, None, 'present', None)])
+        row = self._row('/a')
+        self.assertEqual((row.xxhash, row.md5, row.sha1, row.fastdigest), ('y', None, None, None))
+
+    def test_changed_file_clears_digests_missing_from_columns(self):
+        # Scan rows carry no fastdigest column; a stale one must not survive a change
+        self.workspace.add_files_bulk([('/a', 1, 1, 'x', None, None, 'present', 'fd1')])
+        with self.workspace.transaction():
+            self.workspace.conn.execute(upsert_files_sql(FILE_COLUMNS[:7]),
+                                        ('/a', 1, 2, 'y', None, None, 'present'))
+        row = self._row('/a')
+        self.assertEqual((row.modified, row.xxhash, row.fastdigest), (2, 'y', None))
+
+    def test_identical_row_is_not_rewritten(self):
+        self.workspace.add_files_bulk([('/a', 1, 1, 'x', None, None, 'present', None)])
+        changes = self.workspace.conn.total_changes
+        self.workspace.add_files_bulk([('/a', 1, 1, 'x', None, None, 'present', None)])
+        self.assertEqual(self.workspace.conn.total_changes, changes)
+
+
+if __name__ == '__main__':
+    unittest.main()